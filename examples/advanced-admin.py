@@ -33,7 +33,12 @@ from .models import Order, OrderItem, Payment, Product
 
 
 class OrderItemInline(TabularInline):
-    """Inline for order items with pagination and ordering."""
+    """Inline for order items with pagination and ordering.
+
+    Drag-drop renumbers positions within the visible page only; for orders
+    with thousands of lines see WindowedInlineMixin in
+    examples/performance-change-form.py.
+    """
 
     model = OrderItem
     extra = 0
@@ -57,7 +62,11 @@ class OrderItemInline(TabularInline):
 
 
 class OrderHistorySection(TableSection):
-    """Display order history as a table section."""
+    """Display order history as a table section.
+
+    Rendered for every changelist row, expanded or not. For customers with many
+    orders, use the lazy variant in examples/performance-admin.py.
+    """
 
     verbose_name = "Order History"
     related_name = "orders"
@@ -104,7 +113,11 @@ class PaymentDatasetModelAdmin(ModelAdmin):
 
 
 class PaymentsDataset(BaseDataset):
-    """Embed payments changelist in order change form."""
+    """Embed payments changelist in order change form.
+
+    Rendered with every order change form; to fetch it only when the tab is
+    opened, see DeferredDatasetMixin in examples/performance-change-form.py.
+    """
 
     model = Payment
     model_admin = PaymentDatasetModelAdmin
@@ -165,6 +178,7 @@ class OrderAdmin(ModelAdmin):
     ]
     search_fields = ["id", "customer__email", "customer__name"]
     date_hierarchy = "created_at"
+    list_select_related = ["customer"]  # display_customer reads obj.customer per row
 
     # Filter options
     list_filter_submit = True
@@ -262,11 +276,15 @@ class OrderAdmin(ModelAdmin):
         variant=ActionVariant.PRIMARY,
     )
     def export_orders(self, request):
+        # Stub. For a real export of the filtered changelist, stream it —
+        # see StreamingExportMixin in examples/performance-actions.py.
         messages.success(request, "Orders exported successfully.")
         return redirect(reverse_lazy("admin:shop_order_changelist"))
 
     @action(description="Generate Report", icon="assessment")
     def generate_report(self, request):
+        # Stub. To run the report off the request with a progress page, see
+        # BackgroundJobsMixin in examples/performance-actions.py.
         messages.info(request, "Report generation started.")
         return redirect(reverse_lazy("admin:shop_order_changelist"))
 
@@ -294,6 +312,9 @@ class OrderAdmin(ModelAdmin):
         permissions=["change"],
     )
     def mark_shipped(self, request, object_id):
+        # One order at a time. For the changelist-selection variant (one
+        # UPDATE for the whole set), see BulkUpdateMixin in
+        # examples/performance-actions.py.
         order = self.get_object(request, object_id)
         order.status = "shipped"
         order.save()
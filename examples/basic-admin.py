@@ -5,6 +5,7 @@ This example demonstrates a simple ModelAdmin setup with common patterns.
 """
 
 from django.contrib import admin
+from django.db.models import Count
 
 from unfold.admin import ModelAdmin
 from unfold.decorators import display
@@ -20,9 +21,13 @@ class CategoryAdmin(ModelAdmin):
     search_fields = ["name", "slug"]
     prepopulated_fields = {"slug": ("name",)}
 
-    @display(description="Articles")
+    def get_queryset(self, request):
+        # One annotated query instead of obj.articles.count() per row
+        return super().get_queryset(request).annotate(article_total=Count("articles"))
+
+    @display(description="Articles", ordering="article_total")
     def article_count(self, obj):
-        return obj.articles.count()
+        return obj.article_total
 
 
 @admin.register(Article)
@@ -41,7 +46,7 @@ class ArticleAdmin(ModelAdmin):
     ]
     list_display_links = ["title"]
     list_filter = ["status", "category", "created_at"]
-    search_fields = ["title", "content"]
+    search_fields = ["title", "content"]  # large tables: FullTextSearchMixin in performance-admin.py
     date_hierarchy = "created_at"
 
     # Form configuration
@@ -0,0 +1,688 @@
+"""
+Action Performance Patterns for Django Unfold
+
+Unfold actions (actions_list / actions_row / actions_detail) are plain views:
+whatever they do runs inside the request. This file shows how to keep the
+heavy ones from loading whole tables into memory or holding a worker. These
+are project-side patterns on top of the @action decorator — not Unfold APIs.
+
+Covers:
+- Streaming CSV / XLSX export of the filtered changelist (constant memory)
+- Background report jobs (thread pool or Celery) with a polled progress page
+- Set-based bulk status changes (one UPDATE, batched audit + signal)
+- Action permission checks resolved once per request, and permission sets
+  cached per user between requests
+
+Full reference: references/performance.md
+"""
+
+import csv
+import io
+import json
+import os
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
+from functools import cached_property, wraps
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.models import CHANGE, LogEntry
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.utils import model_ngettext
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, Model, Q, Sum
+from django.dispatch import Signal
+from django.http import FileResponse, Http404, HttpResponse, QueryDict, StreamingHttpResponse
+from django.shortcuts import redirect
+from django.template.loader import render_to_string
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy as _
+
+from unfold.admin import ModelAdmin
+from unfold.decorators import action
+
+from .admin_cache import bump_version, connect_permission_signals
+from .models import Order
+
+
+# =============================================================================
+# Streaming export
+# =============================================================================
+# A list action that does `for order in queryset: ...` into an HttpResponse
+# materialises every row (and every model instance) before the first byte is
+# sent. StreamingExportMixin instead:
+#
+# - rebuilds the changelist queryset from the active filters, search and
+#   date_hierarchy (the action URL's querystring, or the changelist page the
+#   button was clicked on via the Referer header), so the export matches what
+#   the user is looking at — without the changelist's COUNT(*)
+#   queries and first page, and a bad querystring redirects back with a
+#   message instead of failing mid-download;
+# - reads rows with values_list(...).iterator(chunk_size=...) — no model
+#   instances, server-side cursor on Postgres, bounded memory;
+# - CSV: yields one line at a time through StreamingHttpResponse;
+# - XLSX: writes with xlsxwriter's constant_memory mode (row-by-row flush to a
+#   temp file), then streams the file with FileResponse. Optional dependency:
+#   pip install xlsxwriter.
+#
+# Cells that start with = + - @ are prefixed with ' so spreadsheet apps don't
+# evaluate them as formulas (CSV injection).
+
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+XLSX_MAX_ROWS = 1_048_576
+
+
+def safe_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the generator."""
+
+    def write(self, value):
+        return value
+
+
+class StreamingExportMixin:
+    export_fields = []  # [(header, values_list path), ...]
+    export_chunk_size = 2000
+
+    def get_changelist(self, request, **kwargs):
+        base = super().get_changelist(request, **kwargs)
+        if not getattr(request, "is_export", False):
+            return base
+
+        class ExportChangeList(base):
+            def get_results(self, request):
+                # The stock one counts the table, counts the filtered rows and
+                # fetches the first page; the export needs only the queryset
+                pass
+
+        return ExportChangeList
+
+    def get_export_queryset(self, request):
+        """Raises IncorrectLookupParameters for a bad querystring, like the changelist."""
+        params = request.GET
+        referer = request.headers.get("referer")
+        if not params and referer:
+            params = QueryDict(urlsplit(referer).query)
+
+        changelist_request = copy(request)
+        changelist_request.GET = params
+        changelist_request.is_export = True
+        changelist = self.get_changelist_instance(changelist_request)
+        # changelist.queryset is filtered, searched and ordered, but not sliced
+        return changelist.queryset
+
+    def get_export_rows(self, queryset):
+        paths = [path for _, path in self.export_fields]
+        for row in queryset.values_list(*paths).iterator(chunk_size=self.export_chunk_size):
+            yield [safe_cell(value) for value in row]
+
+    def export_error(self, request, message):
+        messages.error(request, message)
+        return redirect(f"admin:{self.opts.app_label}_{self.opts.model_name}_changelist")
+
+    def get_export_filename(self, extension):
+        return f"{self.opts.model_name}-{timezone.now():%Y%m%d-%H%M}.{extension}"
+
+    def stream_csv(self, request):
+        # Resolved before streaming starts: an error inside the generator
+        # would cut the download short instead of showing a message
+        try:
+            queryset = self.get_export_queryset(request)
+        except IncorrectLookupParameters:
+            return self.export_error(request, _("The export filters are invalid."))
+
+        writer = csv.writer(Echo())
+        headers = [str(header) for header, _ in self.export_fields]
+
+        def lines():
+            yield writer.writerow(headers)
+            for row in self.get_export_rows(queryset):
+                yield writer.writerow(row)
+
+        response = StreamingHttpResponse(lines(), content_type="text/csv")
+        response["Content-Disposition"] = f'attachment; filename="{self.get_export_filename("csv")}"'
+        return response
+
+    def stream_xlsx(self, request):
+        try:
+            import xlsxwriter
+        except ImportError:
+            return self.export_error(request, _("XLSX export requires the xlsxwriter package."))
+        try:
+            queryset = self.get_export_queryset(request)
+        except IncorrectLookupParameters:
+            return self.export_error(request, _("The export filters are invalid."))
+
+        with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp:
+            path = tmp.name
+        try:
+            workbook = xlsxwriter.Workbook(
+                path,
+                {
+                    "constant_memory": True,  # flush each row to disk as it's written
+                    "strings_to_formulas": False,
+                    "remove_timezone": True,
+                    "default_date_format": "yyyy-mm-dd hh:mm",
+                },
+            )
+            sheet = workbook.add_worksheet()
+            sheet.write_row(0, 0, [str(header) for header, _ in self.export_fields])
+            for row_number, row in enumerate(self.get_export_rows(queryset), start=1):
+                if row_number >= XLSX_MAX_ROWS:
+                    messages.warning(request, _("XLSX is limited to 1,048,575 rows; use CSV for the full export."))
+                    break
+                sheet.write_row(row_number, 0, row)
+            workbook.close()
+            handle = open(path, "rb")  # noqa: SIM115 — closed by FileResponse
+        finally:
+            # POSIX: the open handle keeps the data readable after unlink
+            os.unlink(path)
+
+        return FileResponse(handle, as_attachment=True, filename=self.get_export_filename("xlsx"))
+
+
+# =============================================================================
+# Background report jobs
+# =============================================================================
+# A list action that builds a report inline holds a request worker for as long
+# as the report takes (and hits proxy timeouts). Instead the action enqueues a
+# job and redirects to a progress page that polls a small status endpoint:
+#
+#   generate_report ──submit──▶ executor (thread pool | Celery)
+#        │                          │ job.progress(done, total, message)
+#        ▼                          ▼
+#   progress page ◀──poll── status endpoint ◀── job state in the cache
+#
+# - Job state lives in the cache, so the cache must be shared by every web
+#   process (Redis/Memcached) — the poll may land on a different worker.
+# - The executor is pluggable via settings.ADMIN_JOB_BACKEND:
+#     "myapp.admin.ThreadPoolJobBackend" (default; in-process, fine for a
+#        handful of reports — lost if the process restarts)
+#     "myapp.admin.CeleryJobBackend" (durable; the Celery task id is the job
+#        id, so the run also appears in the TaskResult admin from
+#        examples/third-party-admin.py when django-celery-results is used)
+# - Job functions are referenced by dotted path so Celery can import them,
+#   take (job, **kwargs) and report progress through job.progress().
+# - Results are written to default_storage and downloaded through an admin
+#   view that checks the job belongs to the requesting user.
+# - The progress page renders Unfold's progress component server-side; the
+#   page swaps the fragment in with Alpine.js (already loaded by Unfold).
+
+JOB_TIMEOUT = 60 * 60 * 24
+
+
+class Job:
+    """Cache-backed state of one background job."""
+
+    def __init__(self, job_id, state=None):
+        self.id = job_id
+        self.state = state or {}
+
+    @classmethod
+    def create(cls, user, title):
+        job = cls(
+            uuid.uuid4().hex,
+            {"user_id": user.pk, "title": str(title), "status": "queued", "done": 0, "total": 0, "message": ""},
+        )
+        job.save()
+        return job
+
+    @classmethod
+    def get(cls, job_id):
+        state = cache.get(f"admin-job:{job_id}")
+        return None if state is None else cls(job_id, state)
+
+    def save(self):
+        cache.set(f"admin-job:{self.id}", self.state, JOB_TIMEOUT)
+
+    def update(self, **state):
+        self.state.update(state)
+        self.save()
+
+    def progress(self, done, total, message=""):
+        self.update(status="running", done=done, total=total, message=str(message))
+
+    @property
+    def percent(self):
+        if self.state["status"] == "finished":
+            return 100
+        total = self.state["total"]
+        return int(self.state["done"] * 100 / total) if total else 0
+
+    @property
+    def is_finished(self):
+        return self.state["status"] in ("finished", "failed")
+
+
+def run_job(job_id, func_path, kwargs):
+    """Executed by every backend, in a worker thread or a Celery worker."""
+    job = Job.get(job_id)
+    if job is None:
+        return
+    close_old_connections()
+    try:
+        result_name = import_string(func_path)(job, **kwargs)
+        job.update(status="finished", result=result_name, message="")
+    except Exception as exc:  # noqa: BLE001 — surface any failure on the progress page
+        job.update(status="failed", message=str(exc))
+        raise
+    finally:
+        close_old_connections()
+
+
+class ThreadPoolJobBackend:
+    executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="admin-job")
+
+    def submit(self, job, func_path, kwargs):
+        self.executor.submit(run_job, job.id, func_path, kwargs)
+
+
+try:
+    from celery import shared_task
+except ImportError:  # Celery is optional
+    shared_task = None
+
+if shared_task is not None:
+    run_job_task = shared_task(name="admin_jobs.run_job")(run_job)
+
+
+class CeleryJobBackend:
+    def submit(self, job, func_path, kwargs):
+        # task_id == job id, so the TaskResult row matches the progress page
+        run_job_task.apply_async(args=[job.id, func_path, kwargs], task_id=job.id)
+
+
+def submit_job(user, title, func_path, **kwargs):
+    """Create a job, hand it to the configured backend and return it."""
+    backend_path = getattr(settings, "ADMIN_JOB_BACKEND", f"{__name__}.ThreadPoolJobBackend")
+    job = Job.create(user, title)
+    import_string(backend_path)().submit(job, func_path, kwargs)
+    return job
+
+
+# myapp/reports.py — referenced by dotted path
+def build_order_report(job, *, since=None):
+    """Monthly order count and revenue, one aggregate per month."""
+    queryset = Order.objects.all()
+    if since:
+        queryset = queryset.filter(created_at__gte=since)
+    months = list(queryset.dates("created_at", "month"))
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["Month", "Orders", "Revenue"])
+    for done, month in enumerate(months, start=1):
+        totals = queryset.filter(created_at__year=month.year, created_at__month=month.month).aggregate(
+            orders=Count("pk"), revenue=Sum("total")
+        )
+        writer.writerow([f"{month:%Y-%m}", totals["orders"], totals["revenue"] or 0])
+        job.progress(done, len(months), _("Processed %(month)s") % {"month": f"{month:%B %Y}"})
+
+    return default_storage.save(f"admin-reports/{job.id}.csv", ContentFile(buffer.getvalue().encode()))
+
+
+class BackgroundJobsMixin:
+    """Progress page, status fragment and download views for admin jobs."""
+
+    job_template = "admin/jobs/progress.html"
+    job_fragment_template = "admin/jobs/progress_fragment.html"
+
+    @cached_property
+    def job_url_prefix(self):
+        return f"{self.opts.app_label}_{self.opts.model_name}"
+
+    def get_urls(self):
+        urls = [
+            path("jobs/<str:job_id>/", self.admin_site.admin_view(self.job_view), name=f"{self.job_url_prefix}_job"),
+            path(
+                "jobs/<str:job_id>/status/",
+                self.admin_site.admin_view(self.job_status_view),
+                name=f"{self.job_url_prefix}_job_status",
+            ),
+            path(
+                "jobs/<str:job_id>/download/",
+                self.admin_site.admin_view(self.job_download_view),
+                name=f"{self.job_url_prefix}_job_download",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def get_job_or_404(self, request, job_id):
+        job = Job.get(job_id)
+        if job is None or job.state["user_id"] != request.user.pk:
+            raise Http404
+        return job
+
+    def redirect_to_job(self, job):
+        return redirect(reverse(f"admin:{self.job_url_prefix}_job", args=[job.id]))
+
+    def get_job_context(self, request, job):
+        context = {"job": job}
+        if job.state["status"] == "finished":
+            context["download_url"] = reverse(f"admin:{self.job_url_prefix}_job_download", args=[job.id])
+        return context
+
+    def job_view(self, request, job_id):
+        job = self.get_job_or_404(request, job_id)
+        context = {
+            **self.admin_site.each_context(request),
+            **self.get_job_context(request, job),
+            "opts": self.opts,
+            "title": job.state["title"],
+            "status_url": reverse(f"admin:{self.job_url_prefix}_job_status", args=[job.id]),
+        }
+        return TemplateResponse(request, self.job_template, context)
+
+    def job_status_view(self, request, job_id):
+        # Rendered HTML fragment (Unfold's progress component), polled by the page
+        job = self.get_job_or_404(request, job_id)
+        html = render_to_string(self.job_fragment_template, self.get_job_context(request, job), request)
+        response = HttpResponse(html)
+        response["X-Job-Finished"] = "1" if job.is_finished else "0"
+        return response
+
+    def job_download_view(self, request, job_id):
+        job = self.get_job_or_404(request, job_id)
+        if job.state["status"] != "finished":
+            raise Http404
+        name = job.state["result"]
+        return FileResponse(default_storage.open(name), as_attachment=True, filename=os.path.basename(name))
+
+
+# =============================================================================
+# Set-based bulk status changes
+# =============================================================================
+# Detail actions like mark_shipped / cancel_order do get_object() + save() for
+# one order; clicked hundreds of times that is hundreds of requests, each with
+# its own SELECT, UPDATE and post_save fan-out. The bulk variants below are
+# regular changelist actions (`actions = [...]`, checkbox selection, including
+# "select all N") that run:
+#
+#   SELECT id ... WHERE <selection> AND <eligible> FOR UPDATE    -- lock + pks
+#   UPDATE ... SET status = ..., updated_at = ... WHERE id IN (...)
+#   INSERT INTO django_admin_log ... (one multi-row insert)
+#
+# inside one transaction, then send a single `bulk_updated` signal instead of
+# N post_save signals.
+#
+# - `permissions=["change"]` / `["delete"]` work for queryset actions too:
+#   Django hides the action unless has_change_permission(request) /
+#   has_delete_permission(request) pass.
+# - queryset.update() skips save(), so auto_now fields are set explicitly and
+#   anything hanging off post_save (cache invalidation, search indexes,
+#   webhooks) must also listen to bulk_updated, e.g. the badge cache from
+#   examples/performance-settings.py:
+#       bulk_updated.connect(badges.invalidate_model, sender=Order)
+# - Rows that are not eligible (already shipped, cancelled, ...) are skipped
+#   and reported, not silently overwritten.
+
+bulk_updated = Signal()  # sender=model, pks=[...], changes={field: value}, request=request
+
+
+class BulkUpdateMixin:
+    def bulk_update_selection(self, request, queryset, changes, eligible=None):
+        """Apply `changes` to the eligible rows of the selection with one UPDATE.
+
+        Returns (updated, skipped).
+        """
+        changes = dict(changes)
+        for field in self.opts.concrete_fields:
+            if getattr(field, "auto_now", False):
+                changes.setdefault(field.name, timezone.now())
+
+        with transaction.atomic():
+            # Lock through a plain pk__in queryset: the admin's selection is
+            # .distinct() when searching across multi-valued relations, and
+            # Postgres refuses FOR UPDATE with DISTINCT
+            candidates = self.model._default_manager.filter(pk__in=queryset.order_by().values("pk"))
+            selected = candidates.count()
+            if eligible is not None:
+                candidates = candidates.filter(eligible)
+            # OF keeps rows joined by `eligible` unlocked; MariaDB can't say it
+            lock = {"of": ("self",)} if connection.features.has_select_for_update_of else {}
+            pks = list(candidates.select_for_update(**lock).values_list("pk", flat=True))
+            updated = self.model._default_manager.filter(pk__in=pks).update(**changes) if pks else 0
+            if updated:
+                self.log_bulk_change(request, pks, changes)
+                bulk_updated.send(sender=self.model, pks=pks, changes=changes, request=request)
+
+        return updated, selected - updated
+
+    def log_bulk_change(self, request, pks, changes):
+        # One multi-row INSERT instead of log_change() per object
+        content_type = ContentType.objects.get_for_model(self.model, for_concrete_model=False)
+        fields = [str(self.opts.get_field(name).verbose_name) for name in changes]
+        message = json.dumps([{"changed": {"fields": fields}}])
+        LogEntry.objects.bulk_create(
+            [
+                LogEntry(
+                    user_id=request.user.pk,
+                    content_type_id=content_type.pk,
+                    object_id=str(pk),
+                    object_repr=f"{self.opts.verbose_name} #{pk}"[:200],
+                    action_flag=CHANGE,
+                    change_message=message,
+                )
+                for pk in pks
+            ],
+            batch_size=1000,
+        )
+
+    def message_bulk_result(self, request, updated, skipped, done, reason):
+        if updated:
+            messages.success(
+                request,
+                _("%(count)d %(items)s %(done)s.")
+                % {"count": updated, "items": model_ngettext(self.opts, updated), "done": done},
+            )
+        if skipped:
+            messages.warning(
+                request,
+                _("%(count)d %(items)s skipped (%(reason)s).")
+                % {"count": skipped, "items": model_ngettext(self.opts, skipped), "reason": reason},
+            )
+
+
+# =============================================================================
+# Action permission cache
+# =============================================================================
+# Every action declares permissions=[...], and Unfold resolves each entry to
+# has_<name>_permission(request[, object_id]) or request.user.has_perm() when
+# it builds actions_list, actions_row, actions_detail and
+# actions_submit_line: once per placement and request (not per row, as of
+# Unfold 0.91). Django's own changelist and change form call
+# has_view/change/delete/add_permission 15-20 more times. Each call is cheap
+# on its own. A project method that loads the object (`get_object()` to check
+# its status) is not, and neither are the two permission queries every
+# request starts with.
+#
+# Two layers:
+#
+# - ActionPermissionCacheMixin memoizes every has_*_permission call for the
+#   length of the request, on the request object, so all four action
+#   placements share one answer. Django's and Unfold's built-in checks ignore
+#   the object, so they are memoized once per request. Project methods are
+#   keyed by the object they were asked about, unless they are listed in
+#   `request_level_permissions` (the answer doesn't depend on the row). Those
+#   run once per request however many rows and actions the page has.
+#
+# - CachedPermissionBackend keeps each user's permission set in the cache
+#   between requests: one cache read instead of the user and group
+#   permission queries. A generation key bumped (on commit) by group,
+#   permission and membership changes invalidates every set at once. The
+#   key includes is_superuser, so a demotion takes effect immediately;
+#   is_active is read from the user row on every request anyway.
+#
+#   AUTHENTICATION_BACKENDS = ["myapp.admin.CachedPermissionBackend"]  # replaces ModelBackend
+
+
+class ActionPermissionCacheMixin:
+    request_level_permissions = []  # e.g. ["refund"]: has_refund_permission ignores the object
+    permission_memo_attr = "_admin_permission_memo"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Wrapped once per admin instance; Django and Unfold look the methods
+        # up by name, so the instance attributes are what they call
+        for name in dir(type(self)):
+            if name.startswith("has_") and name.endswith("_permission") and len(name) > len("has__permission"):
+                method = getattr(self, name)
+                if callable(method):
+                    setattr(self, name, self.memoize_permission(name, method))
+
+    def memoize_permission(self, name, method):
+        permission = name[len("has_") : -len("_permission")]
+        request_level = permission in self.request_level_permissions or method.__module__.startswith(
+            ("django.", "unfold.")
+        )
+
+        @wraps(method)
+        def memoized(request, *args, **kwargs):
+            memo = request.__dict__.setdefault(self.permission_memo_attr, {})
+            # Keyed by admin instance: one admin class may be registered for
+            # several models, and get_model_perms() asks each in turn
+            if request_level:
+                key = (id(self), name)
+            else:
+                key = (id(self), name, *map(permission_key, args), *sorted(kwargs.items()))
+            if key not in memo:
+                memo[key] = method(request, *args, **kwargs)
+            return memo[key]
+
+        return memoized
+
+
+def permission_key(obj):
+    # Model instances are keyed by pk (unsaved ones aren't hashable)
+    return (type(obj), obj.pk) if isinstance(obj, Model) else obj
+
+
+class CachedPermissionBackend(ModelBackend):
+    """ModelBackend whose per-user permission sets are cached between requests."""
+
+    cache_alias = "default"
+    prefix = "admin:permissions"
+    timeout = 60 * 60
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return super().get_all_permissions(user_obj, obj)
+        if not hasattr(user_obj, "_perm_cache"):  # ModelBackend's per-instance memo
+            generation_key = f"{self.prefix}:generation"
+            user_key = f"{self.prefix}:{user_obj.pk}:{int(user_obj.is_superuser)}"
+            cached = self.cache.get_many([generation_key, user_key])  # one round trip
+            generation = cached.get(generation_key, 0)
+            entry = cached.get(user_key)
+            if entry is not None and entry[0] == generation:
+                user_obj._perm_cache = entry[1]
+            else:
+                permissions = super().get_all_permissions(user_obj)
+                self.cache.set(user_key, (generation, permissions), self.timeout)
+        return user_obj._perm_cache
+
+    @classmethod
+    def invalidate(cls, sender=None, **kwargs):
+        transaction.on_commit(cls.bump_generation)
+
+    @classmethod
+    def bump_generation(cls):
+        bump_version(caches[cls.cache_alias], f"{cls.prefix}:generation")
+
+
+connect_permission_signals(CachedPermissionBackend.invalidate, CachedPermissionBackend.prefix)
+
+
+# =============================================================================
+# Usage
+# =============================================================================
+
+
+@admin.register(Order)
+class OrderAdmin(ActionPermissionCacheMixin, BulkUpdateMixin, BackgroundJobsMixin, StreamingExportMixin, ModelAdmin):
+    list_display = ["id", "customer", "status", "total", "created_at"]
+    list_filter = ["status", "created_at"]
+    search_fields = ["id", "customer__email", "customer__name"]
+    date_hierarchy = "created_at"
+
+    export_fields = [
+        (_("Order"), "id"),
+        (_("Customer"), "customer__name"),
+        (_("Email"), "customer__email"),
+        (_("Status"), "status"),
+        (_("Total"), "total"),
+        (_("Created"), "created_at"),
+    ]
+
+    # Bulk variants of the mark_shipped / cancel_order detail actions in
+    # examples/advanced-admin.py, driven by the changelist selection
+    actions = ["bulk_mark_shipped", "bulk_cancel_orders"]
+
+    actions_list = [
+        "generate_report",
+        {
+            "title": _("Export"),
+            "items": ["export_orders_csv", "export_orders_xlsx"],
+        },
+    ]
+    actions_row = ["refund_order"]
+    actions_detail = ["refund_order"]
+
+    # has_refund_permission doesn't look at the order: resolved once per
+    # request, not once per row (ActionPermissionCacheMixin)
+    request_level_permissions = ["refund"]
+
+    def has_refund_permission(self, request, object_id=None):
+        return request.user.has_perm("shop.refund_order")
+
+    @action(description=_("Refund"), icon="currency_exchange", permissions=["refund"])
+    def refund_order(self, request, object_id):
+        # The refund form lives on the payment admin (see RefundDialogForm in
+        # examples/advanced-admin.py for a dialog instead)
+        return redirect(f"{reverse('admin:shop_payment_add')}?order={object_id}")
+
+    @action(description=_("Export CSV"), icon="download", permissions=["view"])
+    def export_orders_csv(self, request):
+        return self.stream_csv(request)
+
+    @action(description=_("Export XLSX"), icon="table_view", permissions=["view"])
+    def export_orders_xlsx(self, request):
+        return self.stream_xlsx(request)
+
+    @action(description=_("Generate Report"), icon="assessment", permissions=["view"])
+    def generate_report(self, request):
+        job = submit_job(request.user, _("Monthly order report"), f"{__name__}.build_order_report")
+        return self.redirect_to_job(job)
+
+    @action(description=_("Mark selected orders as shipped"), icon="local_shipping", permissions=["change"])
+    def bulk_mark_shipped(self, request, queryset):
+        updated, skipped = self.bulk_update_selection(
+            request, queryset, {"status": "shipped"}, eligible=Q(status__in=["pending", "processing"])
+        )
+        self.message_bulk_result(request, updated, skipped, _("marked as shipped"), _("not pending or processing"))
+
+    @action(description=_("Cancel selected orders"), icon="cancel", permissions=["delete"])
+    def bulk_cancel_orders(self, request, queryset):
+        updated, skipped = self.bulk_update_selection(
+            request, queryset, {"status": "cancelled"}, eligible=~Q(status__in=["shipped", "delivered", "cancelled"])
+        )
+        self.message_bulk_result(request, updated, skipped, _("cancelled"), _("already shipped or cancelled"))
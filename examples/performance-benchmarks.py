@@ -0,0 +1,811 @@
+"""
+Admin Performance Benchmarks for Django Unfold
+
+A management command that measures the patterns in examples/performance-*.py
+against the stock approach they replace, on your own data. Copy to
+myapp/management/commands/bench_admin.py and run against a production-sized
+database (never against production itself):
+
+    python manage.py bench_admin keyset --page 1000 --repeat 20
+    python manage.py bench_admin export --rows 1000000
+    python manage.py bench_admin change_form --payments 500
+    python manage.py bench_admin inline --items 5000
+    python manage.py bench_admin reorder --items 5000
+    python manage.py bench_admin autocomplete --products 2000000
+    python manage.py bench_admin search --articles 200000 --terms caching index
+    python manage.py bench_admin row_cache --per-page 500
+    python manage.py bench_admin suite --rows 1000000 --users 100000 --save-baseline bench/suite.json
+    python manage.py bench_admin suite --baseline bench/suite.json
+
+Each benchmark prints its metrics (wall-clock milliseconds, peak memory) for
+the baseline and the optimised variant. "suite" drives the example admins'
+endpoints end to end; any benchmark's results can be saved as a JSON
+baseline and later runs checked against it.
+
+The example files each register their own OrderAdmin so they stay
+self-contained. A project has one: combine the mixins in it, and have
+myapp/admin.py export the helper names imported below. Each benchmark looks
+up the registered admin and names the mixin it is missing.
+
+Full reference: references/performance.md
+"""
+
+import csv
+import io
+import json
+import platform
+import resource
+import statistics
+import time
+import tracemalloc
+from decimal import Decimal
+from functools import partial
+
+from django import get_version
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.exceptions import NotRegistered
+from django.contrib.admin.views.autocomplete import AutocompleteJsonView
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch, reverse
+from django.utils.http import urlencode
+
+from .admin import (
+    POSITION_GAP,
+    DeferredDatasetMixin,
+    DeferredDatasetsMixin,
+    FastAutocompleteJsonView,
+    FullTextSearchMixin,
+    KeysetPaginator,
+    RowFragmentCacheMixin,
+    StreamingExportMixin,
+    WindowedInlineMixin,
+    plan_positions,
+)
+from .models import Article, Category, Customer, Order, OrderItem, Payment, Product
+
+
+def measure(func, repeat):
+    """Run func `repeat` times; return median and p95 wall-clock ms."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return {"median_ms": statistics.median(timings), "p95_ms": p95}
+
+
+def measure_memory(func):
+    """Run func once; return wall-clock ms and peak Python heap MB."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"ms": elapsed, "peak_mb": peak / 1024 / 1024}
+
+
+def get_superuser():
+    user = get_user_model()._default_manager.filter(is_superuser=True).first()
+    if user is None:
+        raise CommandError("Create a superuser first; admin views check permissions.")
+    return user
+
+
+def admin_request(path="/admin/"):
+    """A GET request from a superuser, for calling admin views in-process."""
+    request = RequestFactory().get(path)
+    request.user = get_superuser()
+    return request
+
+
+def admin_client():
+    """A logged-in test client, for timing full requests (middleware included)."""
+    host = next((host.lstrip(".") for host in settings.ALLOWED_HOSTS if "*" not in host), "localhost")
+    client = Client(HTTP_HOST=host)
+    client.force_login(get_superuser())
+    return client
+
+
+def registered_admin(model, *mixins):
+    """The admin registered for model, checked for the mixins a benchmark drives."""
+    try:
+        model_admin = admin.site.get_model_admin(model)
+    except NotRegistered:
+        raise CommandError(f"{model._meta.label} isn't registered on admin.site.") from None
+    missing = [mixin.__name__ for mixin in mixins if not isinstance(model_admin, mixin)]
+    if missing:
+        raise CommandError(
+            f"The registered {type(model_admin).__name__} for {model._meta.label} doesn't use "
+            f"{', '.join(missing)}; see \"Benchmark Suite\" in references/performance.md."
+        )
+    return model_admin
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+
+def seed_orders(rows, batch_size=10_000, customers=None):
+    """Top the Order table up to `rows` rows (adjust fields to your models).
+
+    Orders go round-robin to `customers` (a list of pks), or all to one
+    bench customer.
+    """
+    missing = rows - Order.objects.count()
+    if missing <= 0:
+        return
+    if not customers:
+        customer, _ = Customer.objects.get_or_create(email="bench@example.com", defaults={"name": "Bench"})
+        customers = [customer.pk]
+    statuses = ["pending", "processing", "shipped", "delivered", "cancelled"]
+    while missing > 0:
+        size = min(batch_size, missing)
+        Order.objects.bulk_create(
+            Order(
+                customer_id=customers[(missing - i) % len(customers)],
+                status=statuses[i % len(statuses)],
+                subtotal=Decimal("90.00"),
+                tax=Decimal("9.00"),
+                shipping=Decimal("1.00"),
+                total=Decimal("100.00"),
+            )
+            for i in range(size)
+        )
+        missing -= size
+
+
+def seed_payments(count):
+    """Return an order with at least `count` payments (adjust fields to your models)."""
+    seed_orders(1)
+    order = Order.objects.order_by("pk").first()
+    missing = count - order.payments.count()
+    if missing > 0:
+        Payment.objects.bulk_create(
+            Payment(order=order, amount=Decimal("10.00"), method="card", status="completed") for _ in range(missing)
+        )
+    return order
+
+
+def seed_items(count):
+    """Return an order with at least `count` lines (adjust fields to your models)."""
+    seed_orders(1)
+    order = Order.objects.order_by("pk").first()
+    existing = order.items.count()
+    if existing < count:
+        product, _ = Product.objects.get_or_create(name="Bench product", defaults={"price": Decimal("10.00")})
+        OrderItem.objects.bulk_create(
+            (
+                OrderItem(
+                    order=order, product=product, quantity=1, unit_price=Decimal("10.00"), position=index * POSITION_GAP
+                )
+                for index in range(existing + 1, count + 1)
+            ),
+            batch_size=5000,
+        )
+    return order
+
+
+def seed_products(count, batch_size=10_000):
+    """Top the Product table up to `count` rows with varied names and SKUs."""
+    existing = Product.objects.count()
+    colours = ["blue", "red", "green", "black", "white", "amber", "teal", "grey"]
+    kinds = ["shirt", "mug", "lamp", "chair", "cable", "poster", "bottle", "desk"]
+    while existing < count:
+        size = min(batch_size, count - existing)
+        Product.objects.bulk_create(
+            Product(
+                name=f"{colours[i % 8]} {kinds[i // 8 % 8]} {i}",
+                sku=f"SKU-{i:07d}",
+                price=Decimal("10.00"),
+            )
+            for i in range(existing, existing + size)
+        )
+        existing += size
+
+
+def seed_users(count, batch_size=10_000):
+    """Top bench-* users up to `count` (unusable passwords, so none can log in)."""
+    User = get_user_model()
+    existing = User._default_manager.filter(username__startswith="bench-").count()
+    while existing < count:
+        size = min(batch_size, count - existing)
+        User._default_manager.bulk_create(
+            User(username=f"bench-{i:07d}", email=f"bench-{i}@example.com", password=UNUSABLE_PASSWORD_PREFIX)
+            for i in range(existing, existing + size)
+        )
+        existing += size
+
+
+def seed_customers(count, batch_size=10_000):
+    """Top the Customer table up to `count` rows (adjust fields to your models)."""
+    existing = Customer.objects.count()
+    while existing < count:
+        size = min(batch_size, count - existing)
+        Customer.objects.bulk_create(
+            Customer(name=f"Customer {i}", email=f"customer-{i}@example.com") for i in range(existing, existing + size)
+        )
+        existing += size
+
+
+def seed_order_items(per_order, batch_size=10_000):
+    """Give every order without lines `per_order` lines, from 1,000 seeded products."""
+    seed_products(1000)
+    products = list(Product.objects.order_by("pk").values_list("pk", flat=True)[:1000])
+    empty = Order.objects.filter(items__isnull=True).values_list("pk", flat=True)
+    pending = []
+    for order_id in empty.iterator(chunk_size=batch_size):
+        pending.extend(
+            OrderItem(
+                order_id=order_id,
+                product_id=products[(order_id + line) % len(products)],
+                quantity=1 + line % 3,
+                unit_price=Decimal("10.00"),
+                position=(line + 1) * POSITION_GAP,
+            )
+            for line in range(per_order)
+        )
+        if len(pending) >= batch_size:
+            OrderItem.objects.bulk_create(pending)
+            pending = []
+    OrderItem.objects.bulk_create(pending)
+
+
+def seed_articles(count, batch_size=2000):
+    """Top the Article table up to `count` rows of ~1,000-word bodies (adjust fields to your models)."""
+    existing = Article.objects.count()
+    category, _ = Category.objects.get_or_create(slug="bench", defaults={"name": "Bench"})
+    vocabulary = "admin query index cache page filter search table row column join plan scan sort".split()
+    while existing < count:
+        size = min(batch_size, count - existing)
+        Article.objects.bulk_create(
+            Article(
+                title=f"Article {i} about {vocabulary[i % len(vocabulary)]}",
+                slug=f"bench-article-{i}",
+                category=category,
+                content=" ".join(vocabulary[(i * 7 + n) % len(vocabulary)] for n in range(1000)),
+            )
+            for i in range(existing, existing + size)
+        )
+        existing += size
+
+
+# =============================================================================
+# Keyset vs OFFSET pagination
+# =============================================================================
+
+
+def bench_keyset(options):
+    """Fetch changelist page N with OFFSET and with a keyset cursor."""
+    page_number = options["page"]
+    per_page = options["per_page"]
+    queryset = Order.objects.order_by("-created_at", "-pk")
+
+    # The keyset cursor for page N is the last row of page N-1. Find it once,
+    # outside the timed section — in the admin it arrives in the querystring.
+    if page_number < 2:
+        raise CommandError("--page must be 2 or more; page 1 needs no cursor.")
+    offset = (page_number - 1) * per_page
+    boundary = next(iter(queryset[offset - 1 : offset]), None)
+    if boundary is None:
+        raise CommandError(f"Not enough rows for page {page_number} at {per_page} per page.")
+    paginator = KeysetPaginator(queryset, per_page)
+    cursor = paginator.encode_cursor("next", boundary)
+
+    def offset_page():
+        list(queryset[offset : offset + per_page])
+
+    def keyset_page():
+        list(paginator.page_from_cursor(cursor).object_list)
+
+    return {
+        f"offset page {page_number}": measure(offset_page, options["repeat"]),
+        f"keyset page {page_number}": measure(keyset_page, options["repeat"]),
+    }
+
+
+# =============================================================================
+# Streaming vs in-memory export
+# =============================================================================
+
+
+def bench_export(options):
+    """Peak memory of exporting the whole table: in-memory vs streaming CSV."""
+    model_admin = registered_admin(Order, StreamingExportMixin)
+    seed_orders(options["rows"])
+    request = admin_request()
+    headers = [str(header) for header, _ in model_admin.export_fields]
+    paths = [path for _, path in model_admin.export_fields]
+
+    def in_memory():
+        # The usual naive export: every row materialised before responding
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(headers)
+        for row in list(Order.objects.values_list(*paths)):
+            writer.writerow(row)
+        buffer.getvalue()
+
+    def streaming():
+        response = model_admin.stream_csv(request)
+        for _ in response.streaming_content:
+            pass  # a client reading the response
+
+    results = {"streaming csv": measure_memory(streaming)}
+    if not options["skip_baseline"]:
+        results["in-memory csv"] = measure_memory(in_memory)
+    # ru_maxrss is KiB on Linux, bytes on macOS; it only ever grows, which is
+    # why streaming runs first.
+    results["process"] = {"max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+    return results
+
+
+# =============================================================================
+# Change form with eager vs deferred datasets
+# =============================================================================
+
+
+def bench_change_form(options):
+    """Change-form time to first byte with the Payment dataset eager and deferred.
+
+    The test client returns once the TemplateResponse is fully rendered, which
+    is when a real server could send the first byte.
+    """
+    model_admin = registered_admin(Order, DeferredDatasetsMixin)
+    dataset = next(
+        (
+            dataset
+            for dataset in model_admin.change_form_datasets
+            if issubclass(dataset, DeferredDatasetMixin) and dataset.model is Payment
+        ),
+        None,
+    )
+    if dataset is None:
+        raise CommandError("The registered OrderAdmin has no deferred Payment dataset in change_form_datasets.")
+    order = seed_payments(options["payments"])
+    client = admin_client()
+    change_url = reverse("admin:shop_order_change", args=[order.pk])
+    dataset_url = reverse("admin:shop_order_dataset", args=[order.pk, dataset.__name__])
+
+    def get(url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f"GET {url} returned {response.status_code}")
+
+    results = {}
+    original = dataset.deferred
+    try:
+        if not options["skip_baseline"]:
+            dataset.deferred = False
+            results["change form, eager dataset"] = measure(lambda: get(change_url), options["repeat"])
+        dataset.deferred = True
+        results["change form, deferred dataset"] = measure(lambda: get(change_url), options["repeat"])
+        # Paid later, when the tab is opened, in its own request
+        results["deferred dataset fetch"] = measure(lambda: get(dataset_url), options["repeat"])
+    finally:
+        dataset.deferred = original
+    return results
+
+
+# =============================================================================
+# Change form with a windowed inline
+# =============================================================================
+
+
+def bench_inline(options):
+    """Change form (first and last inline page) for an order with --items lines.
+
+    The target is under 200 ms at any --items; queries should not grow with it.
+    """
+    model_admin = registered_admin(Order)
+    inline = next(
+        (
+            inline
+            for inline in model_admin.inlines
+            if issubclass(inline, WindowedInlineMixin) and inline.model is OrderItem
+        ),
+        None,
+    )
+    if inline is None:
+        raise CommandError("The registered OrderAdmin has no WindowedInlineMixin inline for OrderItem.")
+    order = seed_items(options["items"])
+    client = admin_client()
+    change_url = reverse("admin:shop_order_change", args=[order.pk])
+    last_page = (options["items"] + inline.per_page - 1) // inline.per_page
+
+    results = {}
+    for label, url in [("first page", change_url), (f"page {last_page}", f"{change_url}?items-page={last_page}")]:
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        results[f"change form, inline {label}"] = {
+            **measure(lambda url=url: client.get(url), options["repeat"]),
+            "queries": len(queries),
+        }
+    return results
+
+
+# =============================================================================
+# Drag-drop reorder: per-row saves vs planned bulk_update
+# =============================================================================
+
+
+def bench_reorder(options):
+    """Drag one line across a --items inline and write the new order.
+
+    Baseline: dense 0..n-1 positions saved row by row (the stock formset).
+    Planned: gap keys via plan_positions() and one bulk_update.
+    Each run is rolled back, so every repeat performs the same drag.
+    """
+    order = seed_items(options["items"])
+    items = list(order.items.order_by("position", "pk"))
+    if len(items) < 40:
+        raise CommandError("Use --items 40 or more.")
+    original = {item.pk: item.position for item in items}
+    old_index = {item.pk: index for index, item in enumerate(items)}
+
+    new_order = list(items)
+    new_order.insert(len(items) - 10, new_order.pop(10))  # a long drag down the list
+    written = {}
+
+    def rolled_back(name, func):
+        def run():
+            with transaction.atomic():
+                written[name] = func()
+                transaction.set_rollback(True)
+            for item in items:
+                item.position = original[item.pk]
+        return run
+
+    def per_row_saves():
+        count = 0
+        for index, item in enumerate(new_order):
+            if old_index[item.pk] != index:
+                item.position = index
+                item.save()
+                count += 1
+        return count
+
+    def planned():
+        upper = new_order[-1].position + POSITION_GAP * len(new_order)
+        positions = plan_positions([item.position for item in new_order], -1, upper)
+        if positions is None:
+            raise CommandError("Positions have no gaps; run rebalance_positions() on the order first.")
+        changed = []
+        for item, position in zip(new_order, positions):
+            if item.position != position:
+                item.position = position
+                changed.append(item)
+        OrderItem.objects.bulk_update(changed, ["position"])
+        return len(changed)
+
+    results = {}
+    if not options["skip_baseline"]:
+        results["per-row saves"] = measure(rolled_back("baseline", per_row_saves), options["repeat"])
+        results["per-row saves"]["rows_written"] = written["baseline"]
+    results["planned bulk_update"] = measure(rolled_back("planned", planned), options["repeat"])
+    results["planned bulk_update"]["rows_written"] = written["planned"]
+    return results
+
+
+# =============================================================================
+# Autocomplete: stock view vs FastAutocompleteJsonView
+# =============================================================================
+
+
+def bench_autocomplete(options):
+    """Latency of the OrderItem.product autocomplete over --products products.
+
+    "uncached" runs the indexed search on every call (cache_timeout=0);
+    "cached" is a repeated keystroke within the cache window. Create the
+    indexes listed in examples/performance-admin.py first.
+    """
+    seed_products(options["products"])
+    views = {}
+    if not options["skip_baseline"]:
+        views["stock"] = AutocompleteJsonView.as_view(admin_site=admin.site)
+    views["fast, uncached"] = FastAutocompleteJsonView.as_view(admin_site=admin.site, cache_timeout=0)
+    views["fast, cached"] = FastAutocompleteJsonView.as_view(admin_site=admin.site)
+
+    results = {}
+    for term in options["terms"]:
+        params = {"term": term, "app_label": "shop", "model_name": "orderitem", "field_name": "product"}
+        request = admin_request(f"/admin/autocomplete/?{urlencode(params)}")
+        for label, view in views.items():
+            timings = measure(lambda view=view: view(request), options["repeat"])
+            with CaptureQueriesContext(connection) as queries:
+                view(request)
+            results[f"{label} {term!r}"] = {**timings, "queries": len(queries)}
+    return results
+
+
+# =============================================================================
+# Changelist search: search_fields ILIKE vs full-text index
+# =============================================================================
+
+
+def bench_search(options):
+    """First changelist page of ArticleAdmin search results over --articles rows.
+
+    Run the full_text_search_operation() migration first; on backends without
+    full-text support both variants run the same ILIKE search.
+    """
+    model_admin = registered_admin(Article, FullTextSearchMixin)
+    seed_articles(options["articles"])
+    request = admin_request()
+    per_page = model_admin.list_per_page
+
+    def first_page(search, term):
+        queryset, _ = search(request, Article.objects.all(), term)
+        ordering = ["-search_rank", "-pk"] if "search_rank" in queryset.query.annotations else ["-pk"]
+        return list(queryset.order_by(*ordering)[:per_page])
+
+    variants = {}
+    if not options["skip_baseline"]:
+        variants["search_fields"] = partial(admin.ModelAdmin.get_search_results, model_admin)
+    variants[f"full text ({model_admin.full_text_vendor() or 'fallback'})"] = model_admin.get_search_results
+
+    results = {}
+    for term in options["terms"]:
+        for label, search in variants.items():
+            timings = measure(lambda search=search: first_page(search, term), options["repeat"])
+            results[f"{label} {term!r}"] = {**timings, "rows": len(first_page(search, term))}
+    return results
+
+
+# =============================================================================
+# Changelist rendering: row fragment cache off, cold and warm
+# =============================================================================
+
+
+def bench_row_cache(options):
+    """Full changelist request at --per-page rows (run it with --per-page 500).
+
+    "cold" invalidates every row before each request (the first visit, or a
+    page after a bulk change); "warm" is a repeat visit with no rows changed.
+    """
+    per_page = options["per_page"]
+    model_admin = registered_admin(Order, RowFragmentCacheMixin)
+    seed_orders(per_page)
+    client = admin_client()
+    url = reverse("admin:shop_order_changelist")
+    generation_key = f"{model_admin.row_cache_prefix}:generation"
+
+    def get():
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f"GET {url} returned {response.status_code}")
+
+    def cold():
+        model_admin.bump_row_counter(generation_key)
+        get()
+
+    results = {}
+    fields, original_per_page = model_admin.row_cache_fields, model_admin.list_per_page
+    try:
+        model_admin.list_per_page = per_page
+        if not options["skip_baseline"]:
+            model_admin.row_cache_fields = []
+            results[f"{per_page} rows, no row cache"] = measure(get, options["repeat"])
+            model_admin.row_cache_fields = fields
+        results[f"{per_page} rows, cold cache"] = measure(cold, options["repeat"])
+        get()
+        results[f"{per_page} rows, warm cache"] = measure(get, options["repeat"])
+    finally:
+        model_admin.row_cache_fields, model_admin.list_per_page = fields, original_per_page
+    return results
+
+
+# =============================================================================
+# Suite: the example admins at production scale
+# =============================================================================
+# Drives the admin endpoints a user actually hits, through the test client
+# (middleware, permissions, template rendering included), against synthetic
+# fixtures: --rows orders spread over --users customers, --items-per-order
+# lines each, and --users auth users (the defaults are 1M orders, 10M lines
+# and 100k users). Seeding is top-up only, so the first run is slow and
+# later runs start immediately.
+#
+# Per endpoint it records median (p50) and p95 latency over --repeat
+# requests after one warm-up, the query count of one request, and the peak
+# Python heap of one request (tracemalloc, run separately because it slows
+# everything down). Pick endpoints with --scenarios.
+
+
+def seed_suite(options):
+    seed_users(options["users"])
+    seed_customers(options["users"])
+    customers = list(Customer.objects.order_by("pk").values_list("pk", flat=True)[: options["users"]])
+    seed_orders(options["rows"], customers=customers)
+    seed_order_items(options["items_per_order"])
+
+
+def fetch(client, url):
+    """GET url and read the whole body, streamed or not."""
+    response = client.get(url)
+    if response.status_code != 200:
+        raise CommandError(f"GET {url} returned {response.status_code}")
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def suite_scenarios(options):
+    """name -> (url, repeat) for every endpoint the suite can drive."""
+    repeat = options["repeat"]
+    order = Order.objects.order_by("-pk").values_list("pk", flat=True).first()
+    user_opts = get_user_model()._meta
+    orders = reverse("admin:shop_order_changelist")
+    autocomplete = {"term": "blue", "app_label": "shop", "model_name": "orderitem", "field_name": "product"}
+    scenarios = {
+        "order changelist": (orders, repeat),
+        "order changelist, filtered": (f"{orders}?{urlencode({'status__exact': 'shipped'})}", repeat),
+        "order changelist, search": (f"{orders}?{urlencode({'q': 'customer-4242'})}", repeat),
+        "order change form": (reverse("admin:shop_order_change", args=[order]), repeat),
+        "customer changelist": (reverse("admin:shop_customer_changelist"), repeat),
+        "user changelist": (reverse(f"admin:{user_opts.app_label}_{user_opts.model_name}_changelist"), repeat),
+        "product autocomplete": (f"{reverse('admin:autocomplete')}?{urlencode(autocomplete)}", repeat),
+        "command palette": (f"{reverse('admin:search')}?{urlencode({'s': 'customer-4242'})}", repeat),
+    }
+    # Only when the registered OrderAdmin has the streaming export action
+    try:
+        export = reverse("admin:shop_order_export_orders_csv")
+    except NoReverseMatch:
+        return scenarios
+    # One status is a fifth of the table; three runs are enough for a p95
+    scenarios["order export csv"] = (f"{export}?{urlencode({'status__exact': 'cancelled'})}", min(repeat, 3))
+    return scenarios
+
+
+def bench_suite(options):
+    """p50/p95 latency, queries and peak memory for each admin endpoint."""
+    seed_suite(options)
+    client = admin_client()
+    scenarios = suite_scenarios(options)
+    selected = options["scenarios"] or list(scenarios)
+    unknown = set(selected) - set(scenarios)
+    if unknown:
+        raise CommandError(f"Unknown or unavailable scenarios {sorted(unknown)}; choose from {sorted(scenarios)}.")
+
+    results = {}
+    for name in selected:
+        url, repeat = scenarios[name]
+        request = partial(fetch, client, url)
+        request()  # warm-up: template loading, caches, connection
+        with CaptureQueriesContext(connection) as queries:
+            request()
+        results[name] = {
+            **measure(request, repeat),
+            "queries": len(queries),
+            "peak_mb": measure_memory(request)["peak_mb"],
+        }
+    return results
+
+
+# =============================================================================
+# Baselines and regressions
+# =============================================================================
+# --save-baseline writes the results with the environment they were measured
+# in; --baseline compares a run against such a file and exits non-zero on a
+# regression, so CI can run e.g.:
+#
+#     python manage.py bench_admin suite --baseline bench/suite.json
+#
+# Any increase in queries is a regression (the count is deterministic).
+# Latency (*_ms) and memory (*_mb) regress when they grow by more than
+# --tolerance (20% by default) AND by more than a noise floor (--min-ms,
+# 1 MB), so a 2 ms page going to 3 ms doesn't fail the build. Timings only
+# compare on the same hardware and database; record the baseline where the
+# check runs.
+
+
+def environment(options):
+    return {
+        "vendor": connection.vendor,
+        "django": get_version(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "fixtures": {key: options[key] for key in ["rows", "users", "items_per_order"]},
+    }
+
+
+def find_regressions(baseline, results, tolerance, min_ms, min_mb=1.0):
+    """Return one message per metric in `results` that regressed against `baseline`."""
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            before = baseline.get(name, {}).get(metric)
+            if before is None:
+                continue
+            if metric == "queries":
+                regressed = value > before
+            elif metric.endswith("_ms"):
+                regressed = value > before * (1 + tolerance) and value - before > min_ms
+            elif metric.endswith("_mb"):
+                regressed = value > before * (1 + tolerance) and value - before > min_mb
+            else:
+                continue
+            if regressed:
+                regressions.append(f"{name}: {metric} {before:.2f} -> {value:.2f}")
+    return regressions
+
+
+BENCHMARKS = {
+    "keyset": bench_keyset,
+    "export": bench_export,
+    "change_form": bench_change_form,
+    "inline": bench_inline,
+    "reorder": bench_reorder,
+    "autocomplete": bench_autocomplete,
+    "search": bench_search,
+    "row_cache": bench_row_cache,
+    "suite": bench_suite,
+}
+
+
+class Command(BaseCommand):
+    help = "Benchmark admin performance patterns against the stock approach."
+
+    def add_arguments(self, parser):
+        parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+        parser.add_argument("--repeat", type=int, default=10)
+        parser.add_argument("--page", type=int, default=1000)
+        parser.add_argument("--per-page", type=int, default=100)
+        parser.add_argument("--rows", type=int, default=1_000_000, help="Seed the table up to this many rows.")
+        parser.add_argument("--payments", type=int, default=500, help="Payments on the benchmarked order.")
+        parser.add_argument("--items", type=int, default=5000, help="Lines on the benchmarked order.")
+        parser.add_argument("--products", type=int, default=2_000_000, help="Seed Product up to this many rows.")
+        parser.add_argument("--articles", type=int, default=200_000, help="Seed Article up to this many rows.")
+        parser.add_argument(
+            "--terms", nargs="+", default=["SKU-00123", "blue", "bl"], help="Autocomplete or search terms."
+        )
+        parser.add_argument("--skip-baseline", action="store_true", help="Only run the optimised variant.")
+        parser.add_argument("--users", type=int, default=100_000, help="Suite: seed users and customers.")
+        parser.add_argument("--items-per-order", type=int, default=10, help="Suite: lines on every order.")
+        parser.add_argument("--scenarios", nargs="+", help="Suite: only these endpoints.")
+        parser.add_argument("--save-baseline", metavar="PATH", help="Write the results to a JSON baseline.")
+        parser.add_argument("--baseline", metavar="PATH", help="Fail if the results regress against this baseline.")
+        parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed latency/memory growth (0.2 = 20%%).")
+        parser.add_argument("--min-ms", type=float, default=5.0, help="Ignore latency growth below this many ms.")
+
+    def handle(self, *args, **options):
+        benchmark = options["benchmark"]
+        results = BENCHMARKS[benchmark](options)
+        for name, metrics in results.items():
+            formatted = "   ".join(f"{metric} {value:10.2f}" for metric, value in metrics.items())
+            self.stdout.write(f"{name:<32} {formatted}")
+
+        if options["save_baseline"]:
+            with open(options["save_baseline"], "w") as handle:
+                json.dump(
+                    {"benchmark": benchmark, "environment": environment(options), "results": results},
+                    handle,
+                    indent=2,
+                    sort_keys=True,
+                )
+            self.stdout.write(f"Baseline written to {options['save_baseline']}")
+
+        if options["baseline"]:
+            with open(options["baseline"]) as handle:
+                baseline = json.load(handle)
+            if baseline["benchmark"] != benchmark:
+                raise CommandError(f"{options['baseline']} is a {baseline['benchmark']!r} baseline.")
+            if baseline["environment"] != environment(options):
+                self.stderr.write(f"Baseline environment differs: {baseline['environment']}")
+            regressions = find_regressions(baseline["results"], results, options["tolerance"], options["min_ms"])
+            for regression in regressions:
+                self.stderr.write(regression)
+            if regressions:
+                raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}")
+            self.stdout.write(f"No regressions against {options['baseline']}")
@@ -0,0 +1,62 @@
+"""
+Shared Cache Invalidation Helpers for Django Unfold
+
+The invalidation pieces the performance examples have in common. Copy to
+myapp/admin_cache.py; performance-admin.py, performance-actions.py and
+performance-settings.py import from it:
+
+    from .admin_cache import bump_version, connect_permission_signals
+
+Covers:
+- Version counters: one cache key whose increment makes every entry built
+  under the old value miss, without knowing the entries' keys
+- Permission-change signals: one receiver for everything that can change a
+  user's permission set
+
+Full reference: references/performance.md
+"""
+
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+
+# =============================================================================
+# Version counters
+# =============================================================================
+# Cached entries embed (or are keyed by) the version they were built under.
+# The counter never expires: if it were evicted and restarted at 0, entries
+# built under an old 1 could match again. add() creates it at 0 without
+# overwriting a concurrent bump, and incr() is atomic on Redis and Memcached.
+# Call it from transaction.on_commit(), so a rolled-back write bumps nothing
+# and no reader rebuilds from rows that aren't committed yet.
+
+
+def bump_version(cache, key):
+    """Increment the version counter at key, creating it first; return the new value."""
+    cache.add(key, 0, None)
+    return cache.incr(key)
+
+
+# =============================================================================
+# Permission changes
+# =============================================================================
+# A user's permission set changes when their groups or direct permissions
+# change (m2m_changed on the auto-created through models), when a group's
+# permissions change, or when a Group or Permission row is saved or deleted.
+# is_superuser lives on the user row; callers put it in their cache key.
+
+
+def connect_permission_signals(receiver, dispatch_prefix):
+    """Connect receiver(sender, **kwargs) to every change of any user's permission set."""
+    # String senders are resolved lazily once the app registry is ready
+    user_model = settings.AUTH_USER_MODEL
+    for sender in (f"{user_model}_groups", f"{user_model}_user_permissions", "auth.Group_permissions"):
+        m2m_changed.connect(receiver, sender=sender, weak=False, dispatch_uid=f"{dispatch_prefix}:{sender}")
+    for sender in ("auth.Group", "auth.Permission"):
+        for signal in (post_save, post_delete):
+            signal.connect(
+                receiver,
+                sender=sender,
+                weak=False,
+                dispatch_uid=f"{dispatch_prefix}:{sender}:{signal is post_save}",
+            )
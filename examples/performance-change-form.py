@@ -0,0 +1,410 @@
+"""
+Change Form Performance Patterns for Django Unfold
+
+A change form renders the model form, every inline formset and every
+change_form_datasets changelist in one request, one after another. These
+project-side patterns (not Unfold APIs) take the heavy parts off that path.
+Put the mixins BEFORE ModelAdmin / BaseDataset in the bases.
+
+Covers:
+- Deferred change_form_datasets (fetched when their tab is shown)
+- Windowed inlines for thousands of lines (page-only forms, cross-page
+  reordering, diff saves)
+- Bulk position rewrites for drag-drop ordering_field (gap keys, minimal
+  changed set, one bulk_update)
+
+Full reference: references/performance.md
+"""
+
+import bisect
+
+from django.contrib import admin
+from django.contrib.admin.utils import unquote
+from django.contrib.admin.views import main
+from django.contrib.admin.views.main import IGNORED_PARAMS
+from django.core.exceptions import PermissionDenied
+from django.db.models import Max
+from django.http import Http404, HttpResponse
+from django.template.loader import render_to_string
+from django.urls import path, reverse
+
+from unfold.admin import ModelAdmin, TabularInline
+from unfold.datasets import BaseDataset
+from unfold.decorators import display
+from unfold.forms import PaginationInlineFormSet
+
+from .models import Order, OrderItem, Payment
+
+
+# =============================================================================
+# Deferred datasets
+# =============================================================================
+# Opening an order runs the order form, the OrderItemInline formset and the
+# whole PaymentDatasetModelAdmin changelist (COUNT + page query + rendering)
+# before the first byte goes out — even though the payments tab is usually
+# never opened.
+#
+# A deferred dataset renders a placeholder in the change form instead. The
+# placeholder fetches the real dataset HTML from
+#
+#   <object_id>/datasets/<DatasetClassName>/?<current querystring>
+#
+# when its tab becomes active (activeTab, the Alpine state behind Unfold's
+# change-form tabs), or right after page load for datasets without tab = True.
+#
+# - The change form's time-to-first-byte no longer includes the dataset.
+# - Several deferred datasets are fetched as separate requests, so the server
+#   renders them in parallel: under ASGI every request gets its own thread
+#   (Django's sync admin views run via sync_to_async per request); under WSGI
+#   they land on separate workers. The ORM is synchronous either way, so
+#   concurrency comes from separate requests rather than async views.
+# - The current querystring is forwarded, so the dataset's search and
+#   ?payment-p=N pagination links keep working; dataset actions still POST
+#   to the change form, where Unfold handles them as before.
+# - Inline tabs (TabularInline with tab = True) are NOT deferred: their
+#   formsets are part of the change form's POST and must be in the page.
+
+DATASET_PARAM_SUFFIXES = ("-q", "-p")
+
+
+def ignore_dataset_params(datasets):
+    # Same IGNORED_PARAMS extension Unfold applies in changeform_view, so the
+    # dataset's own search/page params aren't treated as changelist filters.
+    extra = [f"{dataset.model._meta.model_name}{suffix}" for dataset in datasets for suffix in DATASET_PARAM_SUFFIXES]
+    main.IGNORED_PARAMS = (*IGNORED_PARAMS, *extra, "_changelist_filters")
+
+
+class DeferredDatasetMixin:
+    deferred = True
+    placeholder_template = "admin/datasets/deferred.html"
+
+    def get_url(self):
+        match = self.request.resolver_match
+        prefix = match.url_name.removesuffix("_change")
+        return reverse(f"{match.namespace}:{prefix}_dataset", args=[self.extra_context["object"], self.id])
+
+    @property
+    def contents(self):
+        if not self.deferred or not self.extra_context.get("object"):
+            return super().contents
+
+        return render_to_string(
+            self.placeholder_template,
+            request=self.request,
+            context={
+                "dataset": self,
+                "url": self.get_url(),
+                "tab_id": f"dataset-{self.model_name}" if self.tab else "general",
+            },
+        )
+
+
+class DeferredDatasetsMixin:
+    """Serves deferred change_form_datasets from a per-object admin URL."""
+
+    def get_urls(self):
+        opts = self.opts
+        urls = [
+            path(
+                "<path:object_id>/datasets/<str:dataset>/",
+                self.admin_site.admin_view(self.dataset_view),
+                name=f"{opts.app_label}_{opts.model_name}_dataset",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def dataset_view(self, request, object_id, dataset):
+        obj = self.get_object(request, unquote(object_id))
+        if obj is None:
+            raise Http404
+        if not self.has_view_or_change_permission(request, obj):
+            raise PermissionDenied
+
+        datasets = self.get_changeform_datasets(request)
+        dataset_class = next((item for item in datasets if item.__name__ == dataset), None)
+        if dataset_class is None:
+            raise Http404
+
+        ignore_dataset_params(datasets)
+        instance = dataset_class(request=request, extra_context={"object": object_id})
+        instance.deferred = False
+        return HttpResponse(instance.contents)
+
+
+# =============================================================================
+# Windowed inlines
+# =============================================================================
+# With per_page, Unfold's PaginationInlineFormSet already builds forms for
+# the current page only (`?items-page=N`). Three things still break or scale
+# badly for an order with thousands of OrderItem lines:
+#
+# 1. Reordering across pages. Unfold's drag-drop JS renumbers the visible
+#    rows 0..per_page-1, so reordering page 40 writes positions that collide
+#    with page 1. WindowedInlineFormSet re-plans the submitted order inside
+#    the position range the window already occupied, so a drag only moves
+#    rows inside the window and every other row keeps its place (see
+#    "Bulk position rewrites" below).
+# 2. The window on POST is found by page number. If lines were added or
+#    deleted since the page was rendered, page N holds different rows and the
+#    posted ids no longer match. The bound formset loads exactly the posted
+#    ids instead.
+# 3. Saves. After re-planning, a row whose position ends up unchanged is
+#    marked unchanged, so Django's save_existing_objects() skips it. Rows
+#    whose only change is their position are written together with one
+#    bulk_update; the change message still lists them.
+#
+# New rows added in the window are appended after the order's last position.
+# Index (order_id, position) so the page query stays an index range scan.
+# The product autocomplete widget still looks up the selected product's label
+# once per form: O(per_page), not O(lines).
+
+
+class WindowedInlineFormSet(PaginationInlineFormSet):
+    ordering_field = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.is_bound and self.per_page:
+            # The rows this window rendered, whatever page they are on now
+            self._queryset = self.queryset.filter(pk__in=self.posted_pks())
+
+    def posted_pks(self):
+        name = self.model._meta.pk.name
+        pks = (self.data.get(f"{self.prefix}-{i}-{name}") for i in range(self.initial_form_count()))
+        return [pk for pk in pks if pk]
+
+    def clean(self):
+        super().clean()
+        if self.ordering_field and not self.non_form_errors() and all(form.is_valid() for form in self.forms):
+            self.remap_positions()
+
+    def remap_positions(self):
+        field = self.ordering_field
+        self.position_updates = []
+        self.rebalance_order = None
+
+        kept = [
+            form for form in self.initial_forms if form.instance.pk is not None and not self._should_delete_form(form)
+        ]
+        old = [form.initial.get(field) for form in kept]
+        if kept and None not in old:
+            # The JS numbers the rows in their new visual order
+            moved = sorted(kept, key=lambda form: form.cleaned_data[field] or 0)
+            positions = plan_positions([form.initial[field] for form in moved], *self.window_bounds(old))
+            if positions is None:
+                # No free keys left in the window's range: renumber on save
+                self.rebalance_order = [form.instance.pk for form in moved]
+                positions = [form.initial[field] for form in moved]
+            for form, position in zip(moved, positions):
+                self.set_position(form, position)
+
+        added = [form for form in self.extra_forms if form.has_changed() and not self._should_delete_form(form)]
+        if added:
+            last = self.model._default_manager.filter(**{self.fk.name: self.instance}).aggregate(last=Max(field))
+            start = (last["last"] or 0) + POSITION_GAP
+            for offset, form in enumerate(added):
+                self.set_position(form, start + offset * POSITION_GAP)
+
+    def window_bounds(self, old):
+        # Rows outside the window sit below min(old) or above max(old); the
+        # first and last pages have nothing on their outer side.
+        page = getattr(self, "page", None)
+        lower = -1 if page is not None and page.number == 1 else min(old) - 1
+        upper = max(old) + POSITION_GAP * (len(old) + 1) if page is not None and not page.has_next() else max(old) + 1
+        return lower, upper
+
+    def set_position(self, form, value):
+        field = self.ordering_field
+        form.cleaned_data[field] = value
+        setattr(form.instance, field, value)
+        if field not in form.changed_data:
+            return
+        # changed_data is cached: taking the field out means save() skips it
+        if form.initial.get(field) == value:
+            form.changed_data.remove(field)
+        elif form.instance.pk is not None and form.changed_data == [field]:
+            form.changed_data.remove(field)
+            self.position_updates.append(form.instance)
+
+    def save(self, commit=True):
+        saved = super().save(commit)
+        if commit and self.ordering_field:
+            self.save_positions()
+        return saved
+
+    def save_positions(self):
+        field = self.ordering_field
+        if getattr(self, "rebalance_order", None):
+            siblings = self.model._default_manager.filter(**{self.fk.name: self.instance})
+            updated = rebalance_positions(siblings, field, self.rebalance_order)
+        else:
+            updated = getattr(self, "position_updates", [])
+            if updated:
+                self.model._default_manager.bulk_update(updated, [field])
+        self.changed_objects.extend((obj, [field]) for obj in updated)
+
+
+class WindowedInlineMixin:
+    formset = WindowedInlineFormSet
+    per_page = 25
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.ordering_field = self.ordering_field
+        return formset
+
+
+# =============================================================================
+# Bulk position rewrites
+# =============================================================================
+# A drag-drop reorder renumbered densely (0, 1, 2, ...) rewrites every row
+# between the drag's source and target — and a stock formset saves each with
+# its own UPDATE. Positions spaced POSITION_GAP apart let most moves touch
+# a single row:
+#
+#   before   A:1024  B:2048  C:3072  D:4096
+#   drag D between A and B           ->  D:1536        (1 row written)
+#
+# plan_positions() keeps the longest run of rows that are already in order
+# (longest increasing subsequence of the old keys) and gives only the other
+# rows new keys, spread evenly in the gaps between their kept neighbours —
+# the minimal changed set. When a gap has run out of integers, the caller
+# falls back to rebalance_positions(): every row is renumbered POSITION_GAP
+# apart. That happens rarely and is written in one bulk_update call, after
+# which single-row moves are possible again.
+#
+# Keys stay integers, so ordering_field can remain the PositiveIntegerField
+# Unfold expects. Rows created with dense positions (0, 1, 2, ...) get
+# spaced out by the first rebalance.
+
+POSITION_GAP = 1024
+
+
+def longest_increasing_run(keys):
+    """Indices of a longest strictly increasing subsequence of keys, O(n log n)."""
+    tails, tail_indices, previous = [], [], [None] * len(keys)
+    for index, key in enumerate(keys):
+        slot = bisect.bisect_left(tails, key)
+        if slot == len(tails):
+            tails.append(key)
+            tail_indices.append(index)
+        else:
+            tails[slot] = key
+            tail_indices[slot] = index
+        previous[index] = tail_indices[slot - 1] if slot else None
+
+    run = set()
+    index = tail_indices[-1] if tail_indices else None
+    while index is not None:
+        run.add(index)
+        index = previous[index]
+    return run
+
+
+def plan_positions(keys, lower, upper):
+    """New keys for rows listed in their new order, given their old keys.
+
+    Rows in the longest already-ordered run keep their key; the others get
+    keys strictly between their neighbours (lower/upper bound the ends).
+    Returns None when a gap is too small, i.e. the range needs rebalancing.
+    """
+    kept = longest_increasing_run(keys)
+    positions = list(keys)
+    left, pending = lower, []
+    for index in range(len(keys) + 1):
+        if index < len(keys) and index not in kept:
+            pending.append(index)
+            continue
+        right = upper if index == len(keys) else keys[index]
+        if pending:
+            if right - left - 1 < len(pending):
+                return None
+            step = (right - left) // (len(pending) + 1)
+            for offset, pending_index in enumerate(pending, start=1):
+                positions[pending_index] = left + step * offset
+            pending = []
+        if index < len(keys):
+            left = keys[index]
+    return positions
+
+
+def rebalance_positions(queryset, field, window_order):
+    """Renumber every row POSITION_GAP apart, with window_order (pks) as one block.
+
+    Returns the rows that changed, written with a single bulk_update call.
+    """
+    rows = list(queryset.order_by(field, "pk").only("pk", field))
+    by_pk = {row.pk: row for row in rows}
+    window = set(window_order)
+
+    ordered, placed = [], False
+    for row in rows:
+        if row.pk not in window:
+            ordered.append(row)
+        elif not placed:
+            ordered.extend(by_pk[pk] for pk in window_order if pk in by_pk)
+            placed = True
+
+    changed = []
+    for index, row in enumerate(ordered, start=1):
+        if getattr(row, field) != index * POSITION_GAP:
+            setattr(row, field, index * POSITION_GAP)
+            changed.append(row)
+    queryset.model._default_manager.bulk_update(changed, [field], batch_size=1000)
+    return changed
+
+
+# =============================================================================
+# Usage
+# =============================================================================
+
+
+class OrderItemInline(WindowedInlineMixin, TabularInline):
+    model = OrderItem
+    extra = 0
+    per_page = 25
+    collapsible = True
+    show_count = True
+    ordering_field = "position"
+    hide_ordering_field = True
+
+    fields = ["product", "quantity", "unit_price", "total_price", "position"]
+    readonly_fields = ["total_price"]
+    autocomplete_fields = ["product"]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).order_by("position", "pk")
+
+    @display(description="Total")
+    def total_price(self, obj):
+        return f"${obj.quantity * obj.unit_price:.2f}"
+
+
+class PaymentDatasetModelAdmin(ModelAdmin):
+    list_display = ["payment_id", "amount_display", "method", "status", "created_at"]
+    list_per_page = 5
+
+    def get_queryset(self, request):
+        # extra_context["object"] is the order being edited
+        return super().get_queryset(request).filter(order_id=self.extra_context["object"])
+
+    @display(description="ID")
+    def payment_id(self, obj):
+        return f"PAY-{obj.id:06d}"
+
+    @display(description="Amount")
+    def amount_display(self, obj):
+        return f"${obj.amount:.2f}"
+
+
+class PaymentsDataset(DeferredDatasetMixin, BaseDataset):
+    model = Payment
+    model_admin = PaymentDatasetModelAdmin
+    tab = True
+
+
+@admin.register(Order)
+class OrderAdmin(DeferredDatasetsMixin, ModelAdmin):
+    list_display = ["id", "customer", "status", "total"]
+    inlines = [OrderItemInline]
+    change_form_datasets = [PaymentsDataset]
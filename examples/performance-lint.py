@@ -0,0 +1,511 @@
+"""
+Admin Performance Lint for Django Unfold
+
+A management command that reads every ModelAdmin registered on an admin site
+and flags configurations that are slow on large tables, before anyone opens
+the page. Copy to myapp/management/commands/lint_admin.py:
+
+    python manage.py lint_admin                      # text report, exit 1 on errors
+    python manage.py lint_admin --format json        # machine-readable, for CI
+    python manage.py lint_admin --no-db              # static checks only
+    python manage.py lint_admin --fail-on warning --ignore full-count
+    python manage.py lint_admin --check-examples     # the example admins' expected findings
+
+Checks:
+- select-related       list_display reads a ForeignKey that isn't select_related
+- prefetch             list_display reads a reverse/many-to-many relation per row
+- search-wildcard      search_fields icontains on a text column with no trigram index
+- full-count           show_full_result_count on a large table (a second COUNT(*))
+- filter-cardinality   list_filter lists every value of a high-cardinality field
+- date-hierarchy-index date_hierarchy on a column without an index
+
+Findings on a table of LARGE_TABLE (100,000) rows or more are errors; the
+rest are warnings. Row counts come from the planner's statistics where the backend
+keeps them (PostgreSQL, MySQL), otherwise from COUNT(*); --no-db skips every
+check that needs them.
+
+Full reference: references/performance.md
+"""
+
+import ast
+import inspect
+import json
+import textwrap
+from dataclasses import asdict, dataclass
+
+from django.contrib import admin
+from django.contrib.admin.filters import AllValuesFieldListFilter, RelatedFieldListFilter
+from django.core.exceptions import FieldDoesNotExist
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models
+from django.utils.module_loading import import_string
+
+from unfold.contrib.filters.admin import AutocompleteSelectFilter, AutocompleteSelectMultipleFilter
+from unfold.contrib.filters.admin.mixins import DropdownMixin
+
+LARGE_TABLE = 100_000
+MAX_FILTER_CHOICES = 200
+MAX_DROPDOWN_CHOICES = 10_000  # beyond this only an autocomplete filter scales
+TEXT_LOOKUPS = {"exact", "iexact", "contains", "icontains", "startswith", "istartswith", "search"}
+
+
+@dataclass
+class Finding:
+    code: str
+    severity: str  # "error" | "warning"
+    admin: str
+    model: str
+    option: str
+    target: str
+    message: str
+
+
+# =============================================================================
+# Model introspection
+# =============================================================================
+
+
+def estimate_rows(model):
+    """Approximate row count of model's table, or None when it can't be read."""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+        elif connection.vendor == "mysql":
+            cursor.execute(
+                "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+                [table],
+            )
+        else:
+            return model._default_manager.count()
+        row = cursor.fetchone()
+    # reltuples is -1 for a table that was never analyzed
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+def resolve_path(model, path):
+    """Follow a "customer__email" path; return (fields, model of the last field) or None."""
+    fields = []
+    for name in path.split("__"):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        fields.append(field)
+        if field.is_relation and field.related_model is not None:
+            model = field.related_model
+    return fields, model
+
+
+def expression_columns(expression):
+    """(column, opclass) pairs inside an index expression like OpClass(Upper("name"), "gin_trgm_ops")."""
+    if isinstance(expression, models.F):
+        return [(expression.name, "")]
+    opclass = getattr(expression, "extra", {}).get("name", "")
+    return [
+        (column, opclass or inner)
+        for source in expression.get_source_expressions()
+        for column, inner in expression_columns(source)
+    ]
+
+
+def is_leading_column(model, field):
+    """Whether a B-tree index (or key) starts with this field."""
+    if field.primary_key or field.unique or getattr(field, "db_index", False):
+        return True
+    leading = [index.fields[0].lstrip("-") for index in model._meta.indexes if index.fields]
+    leading += [fields[0] for fields in model._meta.unique_together if fields]
+    leading += [
+        constraint.fields[0]
+        for constraint in model._meta.constraints
+        if isinstance(constraint, models.UniqueConstraint) and constraint.fields
+    ]
+    return field.name in leading
+
+
+def has_trigram_index(model, field):
+    for index in model._meta.indexes:
+        columns = list(zip([name.lstrip("-") for name in index.fields], index.opclasses or [""] * len(index.fields)))
+        for expression in index.expressions:
+            columns += expression_columns(expression)
+        if any(column == field.name and "trgm" in opclass for column, opclass in columns):
+            return True
+    return False
+
+
+# =============================================================================
+# list_display: relations read per row
+# =============================================================================
+# Display methods are read as source: every obj.a.b... chain in the method
+# body is followed through the model's relations. A forward ForeignKey must
+# be covered by list_select_related (Django's automatic select_related() only
+# follows non-null FKs, and only when an FK is itself a column); a reverse or
+# many-to-many relation needs prefetching. Declarations from
+# @batched(select_related=..., prefetch_related=...) and any string literal
+# in an overridden get_queryset() count as coverage.
+
+
+def attribute_chains(func):
+    """Attribute paths read off the method's object argument, e.g. ["customer", "name"]."""
+    try:
+        tree = ast.parse(textwrap.dedent(inspect.getsource(func)))
+    except (OSError, TypeError, SyntaxError):
+        return []
+    function = tree.body[0]
+    if not isinstance(function, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        return []
+    arguments = [argument.arg for argument in function.args.args]
+    if len(arguments) < 2:
+        return []
+    obj = arguments[1]  # (self, obj)
+
+    # Only the outermost node of obj.a.b is a whole chain
+    inner = {id(node.value) for node in ast.walk(function) if isinstance(node, ast.Attribute)}
+    chains = []
+    for node in ast.walk(function):
+        if not isinstance(node, ast.Attribute) or id(node) in inner:
+            continue
+        chain = []
+        current = node
+        while isinstance(current, ast.Attribute):
+            chain.insert(0, current.attr)
+            current = current.value
+        if isinstance(current, ast.Name) and current.id == obj:
+            chains.append(chain)
+    return chains
+
+
+def relation_paths(model, chain):
+    """Split an attribute chain into (select_related path, prefetch path)."""
+    path = []
+    for name in chain:
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation:
+            break
+        path.append(name)
+        if field.many_to_many or field.one_to_many:
+            return None, "__".join(path)
+        model = field.related_model
+    return ("__".join(path) or None), None
+
+
+def queryset_literals(model_admin):
+    """String literals in an overridden get_queryset(): select_related/prefetch_related arguments."""
+    method = type(model_admin).get_queryset
+    if method.__module__.startswith(("django.", "unfold.")):
+        return set()
+    try:
+        tree = ast.parse(textwrap.dedent(inspect.getsource(method)))
+    except (OSError, TypeError, SyntaxError):
+        return set()
+    return {node.value for node in ast.walk(tree) if isinstance(node, ast.Constant) and isinstance(node.value, str)}
+
+
+def covers(declared, path):
+    return any(entry == path or entry.startswith(f"{path}__") for entry in declared)
+
+
+def check_list_display(model_admin, report, rows):
+    model = model_admin.model
+    select_related = model_admin.list_select_related
+    if select_related is False:
+        # Django calls select_related() when any list_display entry is an FK
+        fk_column = any(
+            isinstance(name, str) and (resolved := resolve_path(model, name)) and resolved[0][-1].many_to_one
+            for name in model_admin.list_display
+        )
+        select_related = fk_column
+    from_queryset = queryset_literals(model_admin)
+
+    for name in model_admin.list_display:
+        func = name if callable(name) else getattr(model_admin, name, None)
+        if func is None:
+            # "customer__name" (Django 5.1+); a bare FK column is checked below
+            chains = [name.split("__")] if isinstance(name, str) and "__" in name else []
+            func_select, func_prefetch = (), ()
+        elif callable(func):
+            chains = attribute_chains(getattr(func, "__func__", func))
+            func_select = getattr(func, "batch_select_related", ())
+            func_prefetch = getattr(func, "batch_prefetch_related", ())
+        else:
+            continue
+        target = getattr(func, "__name__", name) if callable(name) else name
+
+        for chain in chains:
+            select_path, prefetch_path = relation_paths(model, chain)
+            if select_path:
+                if select_related is True and not any(field.null for field in resolve_path(model, select_path)[0]):
+                    continue
+                if covers(select_related if isinstance(select_related, (list, tuple)) else (), select_path):
+                    continue
+                if covers(func_select, select_path) or covers(from_queryset, select_path):
+                    continue
+                report(
+                    "select-related",
+                    model_admin,
+                    "list_display",
+                    target,
+                    f"reads obj.{select_path.replace('__', '.')} per row; add {select_path!r} to list_select_related",
+                    rows,
+                )
+            if prefetch_path and not (covers(func_prefetch, prefetch_path) or covers(from_queryset, prefetch_path)):
+                report(
+                    "prefetch",
+                    model_admin,
+                    "list_display",
+                    target,
+                    f"queries obj.{prefetch_path.replace('__', '.')} per row; prefetch or annotate it "
+                    "(@batched in performance-admin.py)",
+                    rows,
+                )
+
+    # An FK column with an explicit list_select_related that leaves it out
+    if isinstance(model_admin.list_select_related, (list, tuple)):
+        for name in model_admin.list_display:
+            resolved = isinstance(name, str) and resolve_path(model, name)
+            if resolved and resolved[0][-1].many_to_one and not covers(model_admin.list_select_related, name):
+                report(
+                    "select-related",
+                    model_admin,
+                    "list_display",
+                    name,
+                    f"FK column not in list_select_related; add {name!r}",
+                    rows,
+                )
+
+
+# =============================================================================
+# search_fields, list_filter, date_hierarchy, full result count
+# =============================================================================
+
+
+def search_lookup(entry):
+    """("customer__email", "icontains") for the admin's search_fields syntax."""
+    prefixes = {"^": "istartswith", "=": "iexact", "@": "search"}
+    if entry[:1] in prefixes:
+        return entry[1:], prefixes[entry[0]]
+    path, _, lookup = entry.rpartition("__")
+    if path and lookup in TEXT_LOOKUPS:
+        return path, lookup
+    return entry, "icontains"
+
+
+def check_search_fields(model_admin, report, rows):
+    if rows is not None and rows < LARGE_TABLE:
+        return
+    full_text = set(getattr(model_admin, "full_text_fields", ()))
+    for entry in model_admin.search_fields:
+        path, lookup = search_lookup(entry)
+        resolved = resolve_path(model_admin.model, path)
+        if resolved is None or lookup not in {"contains", "icontains"} or path in full_text:
+            continue
+        field = resolved[0][-1]
+        owner = field.model
+        if not isinstance(field, (models.CharField, models.TextField)) or has_trigram_index(owner, field):
+            continue
+        report(
+            "search-wildcard",
+            model_admin,
+            "search_fields",
+            entry,
+            f"{lookup} ('%term%') scans {owner._meta.db_table}.{field.column}; use '^{path}'/'={path}', "
+            "a gin_trgm_ops index, or FullTextSearchMixin",
+            rows,
+        )
+
+
+def check_full_result_count(model_admin, report, rows):
+    if rows is not None and rows >= LARGE_TABLE and model_admin.show_full_result_count:
+        report(
+            "full-count",
+            model_admin,
+            "show_full_result_count",
+            "",
+            f"~{rows:,} rows: every filtered page runs a second, unfiltered COUNT(*); "
+            "set show_full_result_count = False",
+            rows,
+        )
+
+
+def enumerating_filter(filter_class):
+    """Whether the filter renders one choice per value (and so loads them all).
+
+    A filter class can answer for itself with an `enumerates_choices`
+    attribute; CachedAllValuesCheckboxFilter sets it to False.
+    """
+    if filter_class is None:
+        return True
+    if hasattr(filter_class, "enumerates_choices"):
+        return filter_class.enumerates_choices
+    if issubclass(filter_class, (AutocompleteSelectFilter, AutocompleteSelectMultipleFilter)):
+        return False  # searches on demand
+    return issubclass(filter_class, (RelatedFieldListFilter, AllValuesFieldListFilter))
+
+
+def check_list_filter(model_admin, report, rows, use_db):
+    for entry in model_admin.list_filter:
+        if isinstance(entry, (list, tuple)):
+            path, filter_class = entry[0], entry[1]
+        elif isinstance(entry, str):
+            path, filter_class = entry, None
+        else:
+            continue  # a SimpleListFilter decides its own lookups
+        resolved = resolve_path(model_admin.model, path)
+        if resolved is None or not enumerating_filter(filter_class):
+            continue
+        field = resolved[0][-1]
+        dropdown = filter_class is not None and issubclass(filter_class, DropdownMixin)
+        limit = MAX_DROPDOWN_CHOICES if dropdown else MAX_FILTER_CHOICES
+
+        if field.is_relation:
+            choices = estimate_rows(field.related_model) if use_db else None
+            if choices is None or choices <= limit:
+                continue
+            report(
+                "filter-cardinality",
+                model_admin,
+                "list_filter",
+                path,
+                f"lists all ~{choices:,} {field.related_model._meta.verbose_name_plural} on every changelist load; "
+                "use AutocompleteSelectFilter" + ("" if dropdown else " or RelatedDropdownFilter"),
+                choices,
+            )
+        elif not field.choices and not isinstance(field, (models.BooleanField, models.DateField)):
+            if rows is None or rows < LARGE_TABLE:
+                continue
+            report(
+                "filter-cardinality",
+                model_admin,
+                "list_filter",
+                path,
+                f"SELECT DISTINCT over ~{rows:,} rows for the choices on every changelist load; "
+                "use a range/text filter or a cached values filter",
+                rows,
+            )
+
+
+def check_date_hierarchy(model_admin, report, rows):
+    if not model_admin.date_hierarchy:
+        return
+    resolved = resolve_path(model_admin.model, model_admin.date_hierarchy)
+    if resolved is None:
+        return
+    field = resolved[0][-1]
+    if not is_leading_column(field.model, field):
+        report(
+            "date-hierarchy-index",
+            model_admin,
+            "date_hierarchy",
+            model_admin.date_hierarchy,
+            f"drill-down and its date range query scan {field.model._meta.db_table}; "
+            f"add db_index=True or an index starting with {field.name!r}",
+            rows,
+        )
+
+
+# =============================================================================
+# Runner
+# =============================================================================
+
+
+def lint_site(site=admin.site, use_db=True, ignore=()):
+    """Lint every ModelAdmin on site; return a list of Finding."""
+    findings = []
+    for model, model_admin in site._registry.items():
+        rows = estimate_rows(model) if use_db else None
+        skipped = set(ignore) | set(getattr(model_admin, "lint_ignore", ()))
+
+        def report(code, model_admin, option, target, message, size=None):
+            if code in skipped:
+                return
+            findings.append(
+                Finding(
+                    code=code,
+                    severity="error" if size is not None and size >= LARGE_TABLE else "warning",
+                    admin=f"{type(model_admin).__module__}.{type(model_admin).__qualname__}",
+                    model=model._meta.label,
+                    option=option,
+                    target=str(target),
+                    message=message,
+                )
+            )
+
+        check_list_display(model_admin, report, rows)
+        check_search_fields(model_admin, report, rows)
+        check_full_result_count(model_admin, report, rows)
+        check_list_filter(model_admin, report, rows, use_db)
+        check_date_hierarchy(model_admin, report, rows)
+    return findings
+
+
+# The example admins are the fixtures. With the models described in the
+# references (ForeignKeys indexed, Order's "-created_at" seek index, Product's
+# gin_trgm_ops name index), `lint_site(use_db=False)` over examples/
+# basic-admin.py and advanced-admin.py must report at least these
+# (admin class, code, target) findings. advanced-admin.py's OrderAdmin reads
+# obj.customer in display_customer and passes only because of its
+# list_select_related, so deleting that line must add a select-related one.
+EXAMPLE_FINDINGS = {
+    ("CategoryAdmin", "search-wildcard", "name"),
+    ("CategoryAdmin", "search-wildcard", "slug"),
+    ("ArticleAdmin", "search-wildcard", "title"),
+    ("ArticleAdmin", "search-wildcard", "content"),
+    ("ArticleAdmin", "date-hierarchy-index", "created_at"),
+    ("ProductAdmin", "search-wildcard", "sku"),
+    ("OrderAdmin", "search-wildcard", "customer__email"),
+    ("OrderAdmin", "search-wildcard", "customer__name"),
+}
+
+# `lint_admin --check-examples` runs that check on a site with the example
+# admins registered and fails on any finding it doesn't produce.
+
+
+def missing_example_findings(site=admin.site):
+    """EXAMPLE_FINDINGS entries that lint_site(site, use_db=False) doesn't report."""
+    found = {(f.admin.rpartition(".")[2], f.code, f.target) for f in lint_site(site, use_db=False)}
+    return EXAMPLE_FINDINGS - found
+
+
+class Command(BaseCommand):
+    help = "Flag ModelAdmin configurations that are slow on large tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--site", default="django.contrib.admin.site", help="Import path of the AdminSite.")
+        parser.add_argument("--format", choices=["text", "json"], default="text")
+        parser.add_argument("--no-db", action="store_true", help="Skip checks that need row counts.")
+        parser.add_argument("--ignore", nargs="+", default=[], metavar="CODE", help="Checks to skip.")
+        parser.add_argument("--fail-on", choices=["error", "warning", "never"], default="error")
+        parser.add_argument(
+            "--check-examples", action="store_true", help="Check the example admins against EXAMPLE_FINDINGS."
+        )
+
+    def handle(self, *args, **options):
+        site = import_string(options["site"])
+        if options["check_examples"]:
+            missing = missing_example_findings(site)
+            if missing:
+                raise CommandError(
+                    "Expected findings not reported: "
+                    + ", ".join(f"{name} {code}[{target!r}]" for name, code, target in sorted(missing))
+                )
+            self.stdout.write(self.style.SUCCESS(f"All {len(EXAMPLE_FINDINGS)} expected findings reported."))
+            return
+
+        findings = lint_site(site, use_db=not options["no_db"], ignore=options["ignore"])
+        findings.sort(key=lambda finding: (finding.severity != "error", finding.admin, finding.code, finding.target))
+        counts = {severity: sum(f.severity == severity for f in findings) for severity in ["error", "warning"]}
+
+        if options["format"] == "json":
+            self.stdout.write(json.dumps({"findings": [asdict(f) for f in findings], "summary": counts}, indent=2))
+        else:
+            for f in findings:
+                target = f"{f.option}[{f.target!r}]" if f.target else f.option
+                self.stdout.write(f"{f.severity.upper():<8} {f.code:<21} {f.admin} {target}: {f.message}")
+            self.stdout.write(f"{counts['error']} error(s), {counts['warning']} warning(s)")
+
+        fail_on = options["fail_on"]
+        if (fail_on == "error" and counts["error"]) or (fail_on == "warning" and findings):
+            raise CommandError(f"Admin lint failed: {counts['error']} error(s), {counts['warning']} warning(s)")
@@ -0,0 +1,291 @@
+"""
+Admin Query Profiler for Django Unfold
+
+Shows which changelist columns, readonly fields and list_sections cost the
+queries on a page, flags N+1 patterns, and exposes the same report as JSON for
+CI. Project-side code (not an Unfold API): AdminProfilerMixin wraps the
+changelist and change-form views of the admins it is added to. Put it FIRST in
+the bases so it sees every other mixin's queries.
+
+Covers:
+- Per-scope query count, SQL time and wall time (view, render, each @display
+  column / readonly field, each list section)
+- N+1 detection: the same SQL shape repeated per row, with the scope it ran in
+- An Unfold-styled panel appended to the page (?_profile=1)
+- A JSON report for CI assertions (?_profile=json, assert_admin_queries())
+
+Profiling is off unless the request asks for it, and only DEBUG or superusers
+may ask.
+
+Full reference: references/performance.md
+"""
+
+import contextvars
+import functools
+import re
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.contrib import admin
+from django.db import connections
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+
+from unfold.admin import ModelAdmin
+from unfold.decorators import display
+
+from .models import Customer, Order
+
+
+# =============================================================================
+# Recording
+# =============================================================================
+# QueryProfile is installed as a connection execute_wrapper for the duration
+# of one profiled view, on every configured database. Each query is charged to
+# the innermost open scope; scopes also record their inclusive wall time.
+#
+# An SQL "shape" is the statement with its IN (...) lists collapsed. Params
+# are already separate (%s placeholders), so rows that differ only by id
+# share a shape. A shape repeated `n_plus_one_threshold` times or more is
+# reported as an N+1.
+
+current_profile = contextvars.ContextVar("admin_query_profile", default=None)
+
+IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+
+
+def sql_shape(sql):
+    return IN_LIST.sub("IN (...)", sql)
+
+
+class QueryProfile:
+    """Queries and wall time of one admin view, charged to named scopes."""
+
+    def __init__(self, view_name, n_plus_one_threshold=5):
+        self.view_name = view_name
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.stack = []
+        self.queries = []  # (scope, sql, ms)
+        self.wall = defaultdict(float)
+        self.calls = defaultdict(int)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            scope = self.stack[-1] if self.stack else "view"
+            self.queries.append((scope, sql, (time.perf_counter() - start) * 1000))
+
+    @contextmanager
+    def capture(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+    @contextmanager
+    def scope(self, name):
+        self.stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stack.pop()
+            self.wall[name] += (time.perf_counter() - start) * 1000
+            self.calls[name] += 1
+
+    def report(self):
+        scopes = defaultdict(lambda: {"queries": 0, "sql_ms": 0.0})
+        shapes = defaultdict(lambda: {"count": 0, "sql_ms": 0.0, "scopes": set()})
+        for scope, sql, ms in self.queries:
+            scopes[scope]["queries"] += 1
+            scopes[scope]["sql_ms"] += ms
+            shape = shapes[sql_shape(sql)]
+            shape["count"] += 1
+            shape["sql_ms"] += ms
+            shape["scopes"].add(scope)
+
+        n_plus_one = [
+            {"sql": sql, "count": shape["count"], "sql_ms": round(shape["sql_ms"], 2), "scopes": sorted(shape["scopes"])}
+            for sql, shape in shapes.items()
+            if shape["count"] >= self.n_plus_one_threshold
+        ]
+        return {
+            "view": self.view_name,
+            "queries": len(self.queries),
+            "sql_ms": round(sum(ms for _scope, _sql, ms in self.queries), 2),
+            "wall_ms": round(self.wall["view"], 2),
+            "scopes": [
+                {
+                    "scope": name,
+                    "calls": self.calls[name],
+                    "queries": scopes[name]["queries"],
+                    "sql_ms": round(scopes[name]["sql_ms"], 2),
+                    "wall_ms": round(self.wall[name], 2),
+                }
+                for name in sorted(set(scopes) | set(self.wall), key=lambda name: -scopes[name]["queries"])
+            ],
+            "n_plus_one": sorted(n_plus_one, key=lambda item: -item["count"]),
+        }
+
+
+# =============================================================================
+# Admin mixin
+# =============================================================================
+# Columns: the changelist calls getattr(model_admin, name)(obj) for every
+# @display method in list_display (and the change form does the same for
+# readonly_fields), so the admin sets those names on itself as wrapped
+# methods, once in __init__. Names that get_list_display(request) adds per
+# request go in `profiled_columns`. Sections: list_sections is read from the
+# template per row, so it is swapped for subclasses whose render() opens a
+# scope, built once per section class. functools.wraps keeps the attributes
+# @display sets (short_description, boolean, label, header...).
+#
+# The admin is shared by every request in the process, so the wrappers look
+# up the current profile and are a plain call when there is none: one
+# ContextVar.get() per cell in unprofiled requests.
+#
+# Plain model-field columns (a ForeignKey in list_display) are not methods;
+# their queries land in the "render" scope, and the N+1 report shows the SQL
+# shape (SELECT ... FROM shop_customer WHERE id = %s) that names the table.
+
+
+def profiled(scope, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = current_profile.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        with profile.scope(scope):
+            return func(*args, **kwargs)
+
+    wrapper.profiled = True
+    return wrapper
+
+
+profiled_sections = {}  # section class -> its profiled subclass
+
+
+def profiled_section(section_class):
+    if getattr(section_class.render, "profiled", False):
+        return section_class
+    if section_class not in profiled_sections:
+        scope = f"section:{section_class.__name__}"
+        profiled_sections[section_class] = type(
+            section_class.__name__, (section_class,), {"render": profiled(scope, section_class.render)}
+        )
+    return profiled_sections[section_class]
+
+
+class AdminProfilerMixin:
+    profile_param = "_profile"  # ?_profile=1 -> panel, ?_profile=json -> report
+    profile_template = "admin/profiler/panel.html"
+    n_plus_one_threshold = 5
+    profiled_columns = []  # methods get_list_display() adds beyond list_display
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in dict.fromkeys([*self.list_display, *self.readonly_fields, *self.profiled_columns]):
+            if isinstance(name, str) and callable(getattr(type(self), name, None)):
+                setattr(self, name, profiled(f"column:{name}", getattr(self, name)))
+        if self.list_sections:
+            self.list_sections = [profiled_section(section) for section in self.list_sections]
+
+    def can_profile(self, request):
+        return settings.DEBUG or request.user.is_superuser
+
+    def changelist_view(self, request, extra_context=None):
+        return self.profile_view(request, "changelist", super().changelist_view, request, extra_context)
+
+    def changeform_view(self, request, object_id=None, form_url="", extra_context=None):
+        return self.profile_view(
+            request, "change_form", super().changeform_view, request, object_id, form_url, extra_context
+        )
+
+    def profile_view(self, request, view_name, view, *args):
+        mode = request.GET.get(self.profile_param)
+        if not mode or not self.can_profile(request):
+            return view(*args)
+
+        # The changelist would treat the parameter as a filter lookup
+        request.GET = request.GET.copy()
+        del request.GET[self.profile_param]
+
+        profile = QueryProfile(f"{self.opts.label_lower}:{view_name}", self.n_plus_one_threshold)
+        token = current_profile.set(profile)
+        try:
+            with profile.capture(), profile.scope("view"):
+                response = view(*args)
+                if hasattr(response, "render") and not response.is_rendered:
+                    with profile.scope("render"):
+                        response.render()
+        finally:
+            current_profile.reset(token)
+
+        report = profile.report()
+        if mode == "json":
+            return JsonResponse(report)
+        if response.get("Content-Type", "").startswith("text/html"):
+            table = {
+                "headers": ["Scope", "Calls", "Queries", "SQL ms", "Wall ms"],
+                "rows": [
+                    [scope["scope"], scope["calls"], scope["queries"], scope["sql_ms"], scope["wall_ms"]]
+                    for scope in report["scopes"]
+                ],
+            }
+            panel = render_to_string(self.profile_template, {"report": report, "table": table}, request=request)
+            content = response.content.decode(response.charset)
+            response.content = content.replace("</body>", f"{panel}</body>", 1)
+        return response
+
+
+def assert_admin_queries(client, url, max_queries=None, allow_n_plus_one=False):
+    """Fetch an admin URL's profile report and fail on too many queries or any N+1.
+
+    For tests: client must be logged in as a superuser (or run with DEBUG).
+    """
+    separator = "&" if "?" in url else "?"
+    response = client.get(f"{url}{separator}{AdminProfilerMixin.profile_param}=json")
+    assert response.status_code == 200, f"{url} returned {response.status_code}"
+    report = response.json()
+    if max_queries is not None:
+        assert report["queries"] <= max_queries, (
+            f"{report['view']}: {report['queries']} queries (max {max_queries}); by scope: "
+            + ", ".join(f"{scope['scope']}={scope['queries']}" for scope in report["scopes"])
+        )
+    if not allow_n_plus_one:
+        assert not report["n_plus_one"], f"{report['view']}: N+1 detected: {report['n_plus_one'][0]}"
+    return report
+
+
+# =============================================================================
+# Usage
+# =============================================================================
+
+
+@admin.register(Customer)
+class CustomerAdmin(AdminProfilerMixin, ModelAdmin):
+    list_display = ["name", "email", "order_count"]
+    search_fields = ["name", "email"]
+
+    @display(description="Orders")
+    def order_count(self, obj):
+        # One COUNT per row: the profiler reports it under column:order_count
+        # and as an N+1 shape (see BatchedDisplayMixin for the fix)
+        return obj.orders.count()
+
+
+@admin.register(Order)
+class OrderAdmin(AdminProfilerMixin, ModelAdmin):
+    list_display = ["id", "customer", "status", "created_at"]
+    list_select_related = ["customer"]  # remove it and watch the N+1 report
+    readonly_fields = ["created_at"]
+
+
+# tests.py
+#
+#   def test_order_changelist_queries(admin_client):
+#       assert_admin_queries(admin_client, reverse("admin:shop_order_changelist"), max_queries=6)
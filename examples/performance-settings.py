@@ -0,0 +1,1513 @@
+"""
+Settings Callback Performance Patterns for Django Unfold
+
+The callbacks referenced from the UNFOLD settings dict (sidebar badges,
+DASHBOARD_CALLBACK, ENVIRONMENT, GLOBAL_CALLBACK, COMMAND search_callback) run
+on every admin page render for every staff user. This file shows how to keep
+them off the database hot path. Everything here is project-side code; Unfold
+just calls the import-string callbacks as usual.
+
+Covers:
+- Cached, coalesced sidebar badges (TTL, single-flight, one pass, post_save
+  invalidation)
+- Precomputed dashboard metrics (summary table, incremental counters,
+  per-metric staleness bound, rebuild command)
+- Chart data pipeline (declarative series, one grouped query per model,
+  cached JSON, LTTB downsampling to a point budget)
+- Command palette search index (one indexed query across all models,
+  permission-filtered SearchResults, per-model limits, reindex command)
+- Compiled navigation (SIDEBAR, TABS, ACCOUNT, SITE_DROPDOWN resolved once per
+  locale and permission set, invalidated on permission/group changes)
+- Memoized context providers for ENVIRONMENT and GLOBAL_CALLBACK (process,
+  user or request scope with a TTL; Server-Timing profile per request)
+- Fingerprinted STYLES/SCRIPTS bundle (one minified file per type, immutable
+  cache headers, Link: rel=preload hints)
+
+Typically lives in myapp/admin.py (or myapp/admin_callbacks.py) and is
+referenced from settings by import string, exactly like the plain callbacks in
+examples/settings-example.py.
+
+Full reference: references/performance.md
+"""
+
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import re
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from functools import partial
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.exceptions import NotRegistered
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, migrations, models, transaction
+from django.db.models import Count, F, Func, Q, Subquery, Sum, Window
+from django.db.models.functions import RowNumber, Trunc
+from django.db.models.signals import post_delete, post_save
+from django.http import Http404, HttpResponse
+from django.templatetags.static import static
+from django.urls import path, reverse, reverse_lazy
+from django.utils import timezone
+from django.utils.functional import Promise
+from django.utils.module_loading import import_string
+from django.utils.translation import get_language
+from django.utils.translation import gettext_lazy as _
+
+from unfold.dataclasses import SearchResult
+
+from .admin_cache import bump_version, connect_permission_signals
+
+
+# =============================================================================
+# Sidebar badges
+# =============================================================================
+# A plain badge callback runs its COUNT on every page render:
+#
+#     def orders_badge(request):
+#         return Order.objects.filter(status="pending").count() or None
+#
+# BadgeRegistry replaces each of those with a cached value:
+# - TTL per badge; an expired value is still served while ONE request
+#   recomputes it (single-flight via one cache.add() lock per badge, so a
+#   request waits only for missing badges another request is computing;
+#   shared across processes through the cache backend — use Redis/Memcached,
+#   not LocMemCache, when you run more than one worker).
+# - All badges are read with one cache.get_many() per request, and recomputed
+#   together: badges on the same model share one aggregate query
+#   (COUNT(*) FILTER (WHERE ...) per badge).
+# - post_save / post_delete on a watched model invalidates that model's badges
+#   after the transaction commits.
+#
+# Badges here are global (same count for every user). For per-user badges, add
+# the user's id to the cache key.
+
+
+@dataclass(frozen=True)
+class Badge:
+    name: str
+    model: str  # "app_label.ModelName", resolved lazily
+    condition: Q
+    ttl: int
+    hide_zero: bool = True
+
+
+class BadgeRegistry:
+    """Cached, coalesced sidebar badge callbacks."""
+
+    request_attr = "_unfold_badge_values"
+
+    def __init__(self, cache_alias="default", prefix="unfold:badge", lock_timeout=30, wait_timeout=2.0):
+        self.cache_alias = cache_alias
+        self.prefix = prefix
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.badges = {}
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def register(self, name, model, condition, ttl=60, hide_zero=True, invalidate=True):
+        """Register a badge and return the callback to reference from SIDEBAR."""
+        self.badges[name] = Badge(name, model, condition, ttl, hide_zero)
+
+        if invalidate:
+            # String senders are resolved lazily once the app registry is ready
+            for signal in (post_save, post_delete):
+                signal.connect(
+                    self.invalidate_model,
+                    sender=model,
+                    weak=False,
+                    dispatch_uid=f"{self.prefix}:{model}:{signal is post_save}",
+                )
+
+        def callback(request):
+            return self.value(request, name)
+
+        callback.__name__ = f"{name}_badge"
+        return callback
+
+    def key(self, name):
+        return f"{self.prefix}:{name}"
+
+    # -------------------------------------------------------------------------
+    # Reading
+    # -------------------------------------------------------------------------
+
+    def value(self, request, name):
+        # Unfold calls each badge callback separately; the first call in a
+        # request evaluates every badge and the rest read the memoized result.
+        values = getattr(request, self.request_attr, None)
+        if values is None:
+            values = self.evaluate()
+            setattr(request, self.request_attr, values)
+
+        count = values.get(name)
+        if self.badges[name].hide_zero and not count:
+            return None
+        return count
+
+    def evaluate(self):
+        keys = {name: self.key(name) for name in self.badges}
+        cached = self.cache.get_many(list(keys.values()))
+        now = time.time()
+
+        values, stale, missing = {}, [], []
+        for name, key in keys.items():
+            entry = cached.get(key)
+            if entry is None:
+                missing.append(name)
+                continue
+            value, fresh_until = entry
+            values[name] = value
+            if fresh_until <= now:
+                stale.append(name)
+
+        if stale or missing:
+            values.update(self.refresh(stale, missing))
+        return values
+
+    # -------------------------------------------------------------------------
+    # Computing (single-flight)
+    # -------------------------------------------------------------------------
+
+    def lock_key(self, name):
+        return f"{self.key(name)}:lock"
+
+    def refresh(self, stale, missing):
+        # One lock per badge: this request computes the badges it claims, and
+        # waits only for missing badges that another request has claimed.
+        claimed = [name for name in [*stale, *missing] if self.cache.add(self.lock_key(name), 1, self.lock_timeout)]
+        values = {}
+        if claimed:
+            try:
+                values = self.compute_and_store(claimed)
+            finally:
+                self.cache.delete_many([self.lock_key(name) for name in claimed])
+
+        # Stale values are already in hand; for missing ones wait briefly for
+        # the other request, then compute as a fallback.
+        waiting = [name for name in missing if name not in values]
+        deadline = time.monotonic() + self.wait_timeout
+        while waiting:
+            cached = self.cache.get_many([self.key(name) for name in waiting])
+            values.update({name: cached[self.key(name)][0] for name in waiting if self.key(name) in cached})
+            waiting = [name for name in waiting if name not in values]
+            if waiting and time.monotonic() >= deadline:
+                values.update(self.compute_and_store(waiting))
+                break
+            if waiting:
+                time.sleep(0.05)
+        return values
+
+    def compute_and_store(self, names):
+        values = self.compute(names)
+        now = time.time()
+        entries = {}
+        for name, value in values.items():
+            badge = self.badges[name]
+            entries[self.key(name)] = (value, now + badge.ttl)
+        # Keep entries past their TTL so stale values can be served while a
+        # single request recomputes them.
+        max_ttl = max(self.badges[name].ttl for name in names)
+        self.cache.set_many(entries, timeout=max_ttl * 10)
+        return values
+
+    def compute(self, names):
+        """One aggregate query per model, one FILTERed COUNT per badge."""
+        by_model = defaultdict(dict)
+        for name in names:
+            badge = self.badges[name]
+            by_model[badge.model][f"badge_{name}"] = Count("pk", filter=badge.condition)
+
+        values = {}
+        for model, aggregates in by_model.items():
+            result = apps.get_model(model)._default_manager.aggregate(**aggregates)
+            values.update({alias.removeprefix("badge_"): count for alias, count in result.items()})
+        return values
+
+    # -------------------------------------------------------------------------
+    # Invalidation
+    # -------------------------------------------------------------------------
+
+    def invalidate_model(self, sender, **kwargs):
+        label = sender._meta.label_lower
+        keys = [self.key(badge.name) for badge in self.badges.values() if badge.model.lower() == label]
+        if keys:
+            transaction.on_commit(lambda: self.cache.delete_many(keys))
+
+
+badges = BadgeRegistry()
+
+# Referenced from settings exactly like the plain callbacks:
+#   "badge": "myapp.admin.posts_badge"
+#   "badge": "myapp.admin.orders_badge"
+posts_badge = badges.register("posts", "blog.Post", Q(status="draft"), ttl=60)
+orders_badge = badges.register("orders", "shop.Order", Q(status="pending"), ttl=15)
+
+
+# =============================================================================
+# Dashboard metrics
+# =============================================================================
+# dashboard_callback in examples/settings-example.py runs three COUNTs per
+# dashboard hit. MetricRegistry keeps those numbers in a small summary table
+# and the callback reads them with one indexed SELECT:
+#
+# - Unconditional counters ("all orders") are kept up to date incrementally:
+#   +1 on post_save(created=True), -1 on post_delete, applied once the
+#   writing transaction commits. Inside it, the UPDATE would hold the counter
+#   row's lock until COMMIT and serialize every concurrent order write; after
+#   it, the lock lasts one autocommit statement, and rolled-back inserts
+#   never count.
+# - Filtered counters ("pending orders") can't be maintained from signals
+#   without knowing the previous row state, so they are recounted (rolled up)
+#   when they are older than their staleness bound.
+# - Every metric has a staleness bound (max_age). Incremental counters use it
+#   too: bulk_create(), queryset.update() and queryset.delete() don't send
+#   signals, so a periodic recount corrects drift.
+# - Only one request recounts an expired metric: it claims the row with a
+#   conditional UPDATE of refreshed_at, and everyone else reads the current
+#   value meanwhile.
+# - A recount is a single UPDATE with the COUNT as a subquery, so increments
+#   that commit while it runs aren't overwritten by an older count.
+# - `manage.py rebuild_dashboard_metrics` recounts everything (run it after
+#   deploys, bulk imports, or from cron / celery beat as a rollup).
+
+
+# myapp/models.py
+class DashboardMetric(models.Model):
+    key = models.CharField(max_length=100, unique=True)
+    value = models.BigIntegerField(default=0)
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "dashboard metric"
+
+    def __str__(self):
+        return f"{self.key}={self.value}"
+
+
+@dataclass(frozen=True)
+class Metric:
+    name: str
+    model: str  # "app_label.ModelName", resolved lazily
+    condition: Q | None
+    max_age: timedelta
+    incremental: bool
+
+
+class MetricRegistry:
+    """Precomputed dashboard counters with a per-metric staleness bound."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, name, model, condition=None, max_age=timedelta(minutes=5), incremental=None):
+        if incremental is None:
+            incremental = condition is None
+        if incremental and condition is not None:
+            raise ImproperlyConfigured(
+                f"Metric {name!r}: filtered metrics can't be maintained incrementally; "
+                "they are recounted when older than max_age."
+            )
+        self.metrics[name] = Metric(name, model, condition, max_age, incremental)
+
+        if incremental:
+            post_save.connect(
+                self.on_save, sender=model, weak=False, dispatch_uid=f"dashboard-metric:{model}:save"
+            )
+            post_delete.connect(
+                self.on_delete, sender=model, weak=False, dispatch_uid=f"dashboard-metric:{model}:delete"
+            )
+
+    def incremental_for(self, sender):
+        label = sender._meta.label_lower
+        return [
+            metric.name
+            for metric in self.metrics.values()
+            if metric.incremental and metric.model.lower() == label
+        ]
+
+    # -------------------------------------------------------------------------
+    # Incremental updates
+    # -------------------------------------------------------------------------
+
+    def on_save(self, sender, created, raw=False, **kwargs):
+        if created and not raw:
+            transaction.on_commit(partial(self.increment, self.incremental_for(sender), 1))
+
+    def on_delete(self, sender, **kwargs):
+        transaction.on_commit(partial(self.increment, self.incremental_for(sender), -1))
+
+    def increment(self, names, delta):
+        # Missing rows are left alone; the first read counts them from scratch.
+        if names:
+            DashboardMetric.objects.filter(key__in=names).update(value=F("value") + delta)
+
+    # -------------------------------------------------------------------------
+    # Reading
+    # -------------------------------------------------------------------------
+
+    def get_many(self, names):
+        """Return {name: value}; recount only metrics past their max_age."""
+        now = timezone.now()
+        rows = {row.key: row for row in DashboardMetric.objects.filter(key__in=names)}
+
+        values = {}
+        for name in names:
+            row = rows.get(name)
+            metric = self.metrics[name]
+            if row is None:
+                values[name] = self.recount(name)
+            elif row.refreshed_at < now - metric.max_age and self.claim(row, now - metric.max_age):
+                values[name] = self.recount(name)
+            else:
+                values[name] = row.value
+        return values
+
+    def claim(self, row, threshold):
+        # Conditional UPDATE: exactly one concurrent request matches the old
+        # refreshed_at and wins the recount.
+        return bool(
+            DashboardMetric.objects.filter(pk=row.pk, refreshed_at__lt=threshold).update(
+                refreshed_at=timezone.now()
+            )
+        )
+
+    # -------------------------------------------------------------------------
+    # Rollups
+    # -------------------------------------------------------------------------
+
+    def count(self, name):
+        """The metric's COUNT(*) as a subquery expression."""
+        metric = self.metrics[name]
+        queryset = apps.get_model(metric.model)._default_manager.order_by()
+        if metric.condition is not None:
+            queryset = queryset.filter(metric.condition)
+        return Subquery(queryset.annotate(count=Func(F("pk"), function="COUNT")).values("count"))
+
+    def recount(self, name):
+        # One UPDATE ... SET value = (SELECT COUNT(*) ...): a count read
+        # first and written back later would overwrite the increments
+        # committed in between.
+        DashboardMetric.objects.get_or_create(key=name, defaults={"refreshed_at": timezone.now()})
+        rows = DashboardMetric.objects.filter(key=name)
+        rows.update(value=self.count(name), refreshed_at=timezone.now())
+        return rows.values_list("value", flat=True).get()
+
+    def rebuild(self, names=None):
+        return {name: self.recount(name) for name in names or self.metrics}
+
+
+metrics = MetricRegistry()
+metrics.register("total_users", "auth.User", max_age=timedelta(hours=1))
+metrics.register("total_orders", "shop.Order", max_age=timedelta(hours=1))
+metrics.register("pending_orders", "shop.Order", Q(status="pending"), max_age=timedelta(minutes=1))
+
+
+# =============================================================================
+# Chart data pipeline
+# =============================================================================
+# A chart built in dashboard_callback usually aggregates the orders table per
+# day on every dashboard load, in one query per series, and sends every day to
+# Chart.js: three years are ~1,100 points per dataset, more than a chart
+# canvas has pixels to show.
+#
+# ChartRegistry declares charts as series and:
+# - computes all series of a chart that share a model and date field in ONE
+#   grouped query (Trunc(date_field, bucket) + one aggregate per series, with
+#   the series' filter= inside the aggregate); index the date field
+# - picks the bucket ("auto": the finest of day/week/month/quarter/year that
+#   fits max_points) and fills empty buckets with 0
+# - downsamples line charts still over max_points with LTTB (Largest Triangle
+#   Three Buckets), which keeps peaks and dips a plain stride would drop; the
+#   indices chosen for the first series are used for all series, so datasets
+#   stay aligned with the shared labels
+# - caches the finished Chart.js JSON string for the chart's TTL
+# - serializes with orjson when installed
+
+BUCKET_DAYS = {"day": 1, "week": 7, "month": 30.44, "quarter": 91.31, "year": 365.25}
+
+
+@dataclass(frozen=True)
+class Series:
+    name: str
+    label: str
+    model: str  # "app_label.ModelName", resolved lazily
+    date_field: str
+    aggregate: object  # Count("pk"), Sum("total", filter=Q(status="delivered")), ...
+    color: str = "var(--color-primary-500)"
+
+
+@dataclass(frozen=True)
+class Chart:
+    name: str
+    series: tuple
+    since: timedelta
+    bucket: str
+    kind: str  # "line" (downsampled) or "bar" (bucketed only)
+    max_points: int
+    ttl: int
+
+
+def bucket_start(day, bucket):
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())  # Monday, like Trunc("week")
+    if bucket == "month":
+        return day.replace(day=1)
+    if bucket == "quarter":
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    if bucket == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def next_bucket(day, bucket):
+    if bucket in ("day", "week"):
+        return day + timedelta(days=BUCKET_DAYS[bucket])
+    months = {"month": 1, "quarter": 3, "year": 12}[bucket] + day.month - 1
+    return day.replace(year=day.year + months // 12, month=months % 12 + 1, day=1)
+
+
+def bucket_label(day, bucket):
+    if bucket == "quarter":
+        return f"Q{(day.month - 1) // 3 + 1} {day.year}"
+    return day.strftime({"month": "%b %Y", "year": "%Y"}.get(bucket, "%Y-%m-%d"))
+
+
+def lttb(values, threshold):
+    """Indices of `threshold` points of `values` chosen by Largest Triangle Three Buckets."""
+    count = len(values)
+    if threshold >= count or threshold < 3:
+        return list(range(count))
+
+    every = (count - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_start, next_end = end, min(int((i + 2) * every) + 1, count)
+        if next_start >= next_end:
+            next_start, next_end = count - 1, count
+        avg_x = (next_start + next_end - 1) / 2
+        avg_y = sum(values[next_start:next_end]) / (next_end - next_start)
+
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((a - avg_x) * (values[j] - values[a]) - (a - j) * (avg_y - values[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(count - 1)
+    return selected
+
+
+def dumps(data):
+    try:
+        import orjson
+    except ImportError:  # orjson is optional
+        return json.dumps(data, separators=(",", ":"))
+    return orjson.dumps(data).decode()
+
+
+class ChartRegistry:
+    """Declarative dashboard chart series: grouped, cached and downsampled."""
+
+    def __init__(self, cache_alias="default", prefix="unfold:chart", max_points=120, ttl=300):
+        self.cache_alias = cache_alias
+        self.prefix = prefix
+        self.max_points = max_points
+        self.ttl = ttl
+        self.charts = {}
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def register(self, name, series, since, bucket="auto", kind="line", max_points=None, ttl=None):
+        if bucket != "auto" and bucket not in BUCKET_DAYS:
+            raise ImproperlyConfigured(f"Chart {name!r}: bucket must be 'auto' or one of {list(BUCKET_DAYS)}.")
+        self.charts[name] = Chart(
+            name, tuple(series), since, bucket, kind, max_points or self.max_points, ttl or self.ttl
+        )
+
+    # -------------------------------------------------------------------------
+    # Reading
+    # -------------------------------------------------------------------------
+
+    def json(self, name):
+        """The chart's Chart.js `data` as a JSON string, for the chart components."""
+        chart = self.charts[name]
+        today = timezone.localdate()
+        key = f"{self.prefix}:{name}:{today.isoformat()}"
+        data = self.cache.get(key)
+        if data is None:
+            data = dumps(self.compute(chart, today))
+            self.cache.set(key, data, chart.ttl)
+        return data
+
+    # -------------------------------------------------------------------------
+    # Computing
+    # -------------------------------------------------------------------------
+
+    def pick_bucket(self, chart):
+        if chart.bucket != "auto":
+            return chart.bucket
+        for bucket, days in BUCKET_DAYS.items():
+            if chart.since.days / days <= chart.max_points:
+                return bucket
+        return "year"
+
+    def compute(self, chart, today):
+        bucket = self.pick_bucket(chart)
+        first = bucket_start(today - chart.since, bucket)
+        days = [first]
+        while next_bucket(days[-1], bucket) <= today:
+            days.append(next_bucket(days[-1], bucket))
+
+        values = {series.name: dict.fromkeys(days, 0) for series in chart.series}
+        groups = defaultdict(list)
+        for series in chart.series:
+            groups[(series.model, series.date_field)].append(series)
+
+        for (model_label, date_field), group in groups.items():
+            model = apps.get_model(model_label)
+            since = first
+            if isinstance(model._meta.get_field(date_field), models.DateTimeField):
+                since = timezone.make_aware(datetime.combine(first, datetime.min.time()))
+            rows = (
+                model._default_manager.filter(**{f"{date_field}__gte": since})
+                .annotate(chart_bucket=Trunc(date_field, bucket, output_field=models.DateField()))
+                .values("chart_bucket")
+                .annotate(**{f"series_{series.name}": series.aggregate for series in group})
+                .order_by("chart_bucket")
+            )
+            for row in rows:
+                for series in group:
+                    if row["chart_bucket"] in values[series.name]:
+                        values[series.name][row["chart_bucket"]] = float(row[f"series_{series.name}"] or 0)
+
+        points = {name: list(by_day.values()) for name, by_day in values.items()}
+        indices = list(range(len(days)))
+        if chart.kind == "line" and len(days) > chart.max_points:
+            indices = lttb(points[chart.series[0].name], chart.max_points)
+
+        return {
+            "labels": [bucket_label(days[i], bucket) for i in indices],
+            "datasets": [
+                {
+                    "label": str(series.label),
+                    "data": [points[series.name][i] for i in indices],
+                    "borderColor": series.color,
+                    "backgroundColor": series.color,
+                }
+                for series in chart.series
+            ],
+        }
+
+
+charts = ChartRegistry()
+charts.register(
+    "sales",
+    series=[
+        Series("orders", "Orders", "shop.Order", "created_at", Count("pk")),
+        Series(
+            "revenue",
+            "Revenue",
+            "shop.Order",
+            "created_at",
+            Sum("total", filter=Q(status="delivered")),
+            color="var(--color-primary-300)",
+        ),
+    ],
+    since=timedelta(days=3 * 365),
+    bucket="day",  # ~1,100 buckets, downsampled to 120 points
+)
+
+
+# myapp/admin.py — DASHBOARD_CALLBACK
+def dashboard_callback(request, context):
+    """Dashboard context from precomputed metrics (one indexed SELECT)."""
+    from shop.models import Order
+
+    context.update(metrics.get_many(["total_users", "total_orders", "pending_orders"]))
+    # Top-N by an indexed column is already cheap; no need to precompute it.
+    context["recent_orders"] = Order.objects.order_by("-created_at")[:5]
+    # {% component "unfold/components/chart/line.html" with data=sales_chart %}
+    context["sales_chart"] = charts.json("sales")
+    return context
+
+
+# myapp/management/commands/rebuild_dashboard_metrics.py
+class RebuildDashboardMetricsCommand(BaseCommand):  # name it `Command` in its own module
+    help = "Recount dashboard metrics into the DashboardMetric summary table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("names", nargs="*", help="Metric names (default: all).")
+
+    def handle(self, *args, **options):
+        unknown = set(options["names"]) - set(metrics.metrics)
+        if unknown:
+            raise CommandError(f"Unknown metrics: {', '.join(sorted(unknown))}")
+        for name, value in metrics.rebuild(options["names"]).items():
+            self.stdout.write(f"{name}: {value}")
+
+
+# =============================================================================
+# Command palette search index
+# =============================================================================
+# With COMMAND["search_models"] = True, every keystroke in the palette runs an
+# OR of icontains lookups over search_fields for EVERY searchable model, and a
+# search_callback adds its own scans on top. CommandSearchIndex replaces both
+# with one denormalised table, kept in sync by signals:
+#
+#   UNFOLD["COMMAND"] = {
+#       "search_models": False,  # turn off the per-model fan-out
+#       "search_callback": "myapp.admin.command_search_callback",
+#       "show_history": True,
+#   }
+#
+# - `document` holds the lower-cased searchable text of one object, so a
+#   search is one `document LIKE '%term%'` over one table. On Postgres a
+#   pg_trgm GIN index serves that LIKE (add command_search_index_operation()
+#   to the migration; it does nothing on other backends) and results are
+#   ranked by trigram word similarity. Other backends get the same
+#   single-table query without the index.
+# - Results are limited per model inside the query (ROW_NUMBER() per
+#   content type), filtered to models the user may view or change through
+#   their ModelAdmin, and returned as unfold SearchResult objects.
+# - `manage.py rebuild_command_search_index` builds (or warms) the index.
+#   Rows changed by queryset.update()/bulk_create() send no signals, so
+#   re-run it after bulk operations.
+
+
+# myapp/models.py
+class CommandSearchEntry(models.Model):
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.CharField(max_length=64)
+    title = models.CharField(max_length=255)
+    description = models.CharField(max_length=255, blank=True)
+    document = models.TextField()  # lower-cased searchable text
+
+    class Meta:
+        verbose_name_plural = "command search entries"
+        constraints = [
+            models.UniqueConstraint(fields=["content_type", "object_id"], name="command_search_entry_unique"),
+        ]
+        # The trigram index is Postgres-only, so it is created by
+        # command_search_index_operation() in a migration, not declared here
+
+    def __str__(self):
+        return self.title
+
+
+def command_search_index_operation(model_label="myapp.CommandSearchEntry", name="command_search_trgm"):
+    """A migration operation creating (and dropping) the pg_trgm index on `document`.
+
+    No-op on other backends, which run the same query without the index.
+    """
+
+    def forwards(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        table = schema_editor.quote_name(apps.get_model(model_label)._meta.db_table)
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm", params=None)
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {schema_editor.quote_name(name)} ON {table} USING gin (document gin_trgm_ops)",
+            params=None,
+        )
+
+    def backwards(apps, schema_editor):
+        if schema_editor.connection.vendor == "postgresql":
+            schema_editor.execute(f"DROP INDEX IF EXISTS {schema_editor.quote_name(name)}", params=None)
+
+    return migrations.RunPython(forwards, backwards)
+
+
+@dataclass(frozen=True)
+class SearchSource:
+    model: str  # "app_label.ModelName", resolved lazily
+    fields: tuple
+    title: object  # attribute name or callable(obj)
+    description: object
+    icon: str | None
+    limit: int
+
+
+def resolve(obj, spec):
+    if spec is None:
+        return ""
+    value = spec(obj) if callable(spec) else getattr(obj, spec)
+    return "" if value is None else str(value)
+
+
+class CommandSearchIndex:
+    """One indexed table searched by the command palette for all models."""
+
+    def __init__(self, default_limit=10, min_length=2, admin_site=admin.site):
+        self.default_limit = default_limit
+        self.min_length = min_length
+        self.admin_site = admin_site
+        self.sources = {}
+
+    def register(self, model, fields, title=str, description=None, icon=None, limit=None):
+        key = model.lower()
+        self.sources[key] = SearchSource(
+            model, tuple(fields), title, description, icon, limit or self.default_limit
+        )
+        post_save.connect(self.on_save, sender=model, weak=False, dispatch_uid=f"command-search:{key}:save")
+        post_delete.connect(self.on_delete, sender=model, weak=False, dispatch_uid=f"command-search:{key}:delete")
+
+    # -------------------------------------------------------------------------
+    # Indexing
+    # -------------------------------------------------------------------------
+
+    def build_entry(self, source, obj, content_type):
+        return CommandSearchEntry(
+            content_type=content_type,
+            object_id=str(obj.pk),
+            title=resolve(obj, source.title)[:255],
+            description=resolve(obj, source.description)[:255],
+            document=" ".join(resolve(obj, name) for name in source.fields).lower(),
+        )
+
+    def on_save(self, sender, instance, raw=False, **kwargs):
+        if raw:
+            return
+        source = self.sources[sender._meta.label_lower]
+        entry = self.build_entry(source, instance, ContentType.objects.get_for_model(sender))
+        CommandSearchEntry.objects.update_or_create(
+            content_type=entry.content_type,
+            object_id=entry.object_id,
+            defaults={"title": entry.title, "description": entry.description, "document": entry.document},
+        )
+
+    def on_delete(self, sender, instance, **kwargs):
+        CommandSearchEntry.objects.filter(
+            content_type=ContentType.objects.get_for_model(sender), object_id=str(instance.pk)
+        ).delete()
+
+    def rebuild(self, labels=None, chunk_size=2000):
+        """Reindex the given models (default: all); return {label: rows}."""
+        counts = {}
+        for key in labels or self.sources:
+            source = self.sources[key.lower()]
+            model = apps.get_model(source.model)
+            content_type = ContentType.objects.get_for_model(model)
+            with transaction.atomic():
+                CommandSearchEntry.objects.filter(content_type=content_type).delete()
+                batch, total = [], 0
+                for obj in model._default_manager.iterator(chunk_size=chunk_size):
+                    batch.append(self.build_entry(source, obj, content_type))
+                    if len(batch) >= chunk_size:
+                        CommandSearchEntry.objects.bulk_create(batch)
+                        total += len(batch)
+                        batch = []
+                CommandSearchEntry.objects.bulk_create(batch)
+                counts[source.model] = total + len(batch)
+        return counts
+
+    # -------------------------------------------------------------------------
+    # Searching
+    # -------------------------------------------------------------------------
+
+    def allowed_content_types(self, request):
+        allowed = {}
+        for key, source in self.sources.items():
+            model = apps.get_model(source.model)
+            try:
+                model_admin = self.admin_site.get_model_admin(model)
+            except NotRegistered:
+                continue
+            if model_admin.has_view_or_change_permission(request):
+                allowed[ContentType.objects.get_for_model(model).pk] = source
+        return allowed
+
+    def search(self, request, search_term):
+        term = search_term.strip().lower()
+        if len(term) < self.min_length:
+            return []
+        allowed = self.allowed_content_types(request)
+        if not allowed:
+            return []
+
+        if connection.vendor == "postgresql":
+            from django.contrib.postgres.search import TrigramWordSimilarity
+
+            rank_order = TrigramWordSimilarity(term, "document").desc()
+        else:
+            rank_order = F("title").asc()
+
+        max_limit = max(source.limit for source in allowed.values())
+        entries = (
+            CommandSearchEntry.objects.filter(content_type_id__in=allowed, document__contains=term)
+            .annotate(
+                rank=Window(RowNumber(), partition_by=F("content_type_id"), order_by=rank_order)
+            )
+            .filter(rank__lte=max_limit)
+            .order_by("content_type_id", "rank")
+        )
+
+        results = []
+        for entry in entries:
+            source = allowed[entry.content_type_id]
+            if entry.rank > source.limit:
+                continue
+            content_type = ContentType.objects.get_for_id(entry.content_type_id)
+            results.append(
+                SearchResult(
+                    title=entry.title,
+                    description=entry.description,
+                    link=reverse(
+                        f"admin:{content_type.app_label}_{content_type.model}_change",
+                        args=[entry.object_id],
+                    ),
+                    icon=source.icon,
+                )
+            )
+        return results
+
+
+search_index = CommandSearchIndex()
+search_index.register(
+    "shop.Order",
+    fields=["reference", "shipping_name"],
+    title="reference",
+    description=lambda order: f"Order #{order.pk:05d}",
+    icon="receipt_long",
+    limit=20,
+)
+search_index.register("shop.Product", fields=["name", "sku"], title="name", description="sku", icon="inventory_2")
+search_index.register("auth.User", fields=["username", "email", "first_name", "last_name"], title="username",
+                      description="email", icon="person", limit=5)
+
+
+# myapp/admin.py — COMMAND["search_callback"]
+def command_search_callback(request, search_term):
+    return search_index.search(request, search_term)
+
+
+# myapp/management/commands/rebuild_command_search_index.py
+class RebuildCommandSearchIndexCommand(BaseCommand):  # name it `Command` in its own module
+    help = "Rebuild (or warm) the command palette search index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("models", nargs="*", help='Model labels, e.g. "shop.Order" (default: all).')
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        unknown = {label for label in options["models"] if label.lower() not in search_index.sources}
+        if unknown:
+            raise CommandError(f"Not registered in the search index: {', '.join(sorted(unknown))}")
+        for label, rows in search_index.rebuild(options["models"], options["chunk_size"]).items():
+            self.stdout.write(f"{label}: {rows} entries")
+
+
+# =============================================================================
+# Compiled navigation
+# =============================================================================
+# SIDEBAR["navigation"], TABS, ACCOUNT["navigation"] and SITE_DROPDOWN written
+# as literals (examples/settings-example.py) are re-resolved on every render:
+# each reverse_lazy() link is reversed again (several times per item while
+# Unfold works out the active item and tab), each gettext_lazy() title is
+# translated again and each `permission` callback runs again.
+#
+# CompiledNavigation resolves a structure once per (locale, permission
+# fingerprint) and serves the plain result afterwards:
+#
+# - reverse_lazy / gettext_lazy values become plain strings
+# - `permission` callbacks are evaluated; items that fail are removed (and
+#   groups or tabs left with no items), so Unfold has nothing left to check
+# - link callables, `active`, badges and icons are kept; Unfold still handles
+#   them per request (badges: see BadgeRegistry above)
+# - "__user_pk__" in a link is replaced with the current user's pk per request
+#
+# The fingerprint is the user's permission set ("superuser" for superusers),
+# so `permission` callbacks must depend only on the user's permissions or
+# superuser flag, not on the request path or other user fields; override
+# fingerprint() otherwise. Compiled trees live in process memory (they may hold
+# callables); editing permissions, groups or memberships bumps a generation
+# number in the shared cache, which every process checks once per request.
+
+USER_PK_PLACEHOLDER = "__user_pk__"
+REMOVED = object()
+
+
+class CompiledNavigation:
+    """UNFOLD navigation structures resolved once per locale and permission set."""
+
+    request_attr = "_unfold_navigation_generation"
+
+    def __init__(self, cache_alias="default", prefix="unfold:navigation", max_entries=500):
+        self.cache_alias = cache_alias
+        self.prefix = prefix
+        self.max_entries = max_entries
+        self.sources = {}
+        self.compiled = {}
+        connect_permission_signals(self.invalidate, self.prefix)
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def register(self, name, source):
+        """Register a navigation structure and return the callback to reference from UNFOLD."""
+        self.sources[name] = source
+
+        def callback(request):
+            return self.get(request, name)
+
+        callback.__name__ = f"{name}_navigation"
+        return callback
+
+    # -------------------------------------------------------------------------
+    # Reading
+    # -------------------------------------------------------------------------
+
+    def fingerprint(self, user):
+        if user.is_superuser:
+            return "superuser"
+        permissions = ",".join(sorted(user.get_all_permissions()))
+        return hashlib.sha256(permissions.encode()).hexdigest()[:16]
+
+    def generation(self, request):
+        # Several structures are read per render; check the cache once
+        generation = getattr(request, self.request_attr, None)
+        if generation is None:
+            generation = self.cache.get(f"{self.prefix}:generation", 0)
+            setattr(request, self.request_attr, generation)
+        return generation
+
+    def get(self, request, name):
+        key = (name, self.generation(request), get_language(), self.fingerprint(request.user))
+        entry = self.compiled.get(key)
+        if entry is None:
+            if len(self.compiled) >= self.max_entries:
+                self.compiled.clear()
+            tree = self.compile(self.sources[name], request)
+            entry = self.compiled[key] = (tree, USER_PK_PLACEHOLDER in repr(tree))
+        tree, personal = entry
+        return self.personalize(tree, str(request.user.pk)) if personal else tree
+
+    # -------------------------------------------------------------------------
+    # Compiling
+    # -------------------------------------------------------------------------
+
+    def compile(self, value, request):
+        if isinstance(value, Promise):
+            return str(value)
+        if isinstance(value, (list, tuple)):
+            items = [self.compile(item, request) for item in value]
+            return [item for item in items if item is not REMOVED]
+        if isinstance(value, dict):
+            if not self.has_permission(value.get("permission"), request):
+                return REMOVED
+            compiled = {key: self.compile(item, request) for key, item in value.items() if key != "permission"}
+            if value.get("items") and not compiled["items"]:
+                return REMOVED  # every child was filtered out
+            return compiled
+        return value
+
+    def has_permission(self, callback, request):
+        # Same contract as Unfold's `permission` key: callable or import string
+        if callback is None:
+            return True
+        if isinstance(callback, str):
+            callback = import_string(callback)
+        return callback(request) == True  # noqa: E712 (Unfold's own test)
+
+    def personalize(self, value, user_pk):
+        if isinstance(value, str):
+            return value.replace(USER_PK_PLACEHOLDER, user_pk)
+        if isinstance(value, list):
+            return [self.personalize(item, user_pk) for item in value]
+        if isinstance(value, dict):
+            return {key: self.personalize(item, user_pk) for key, item in value.items()}
+        return value
+
+    # -------------------------------------------------------------------------
+    # Invalidation
+    # -------------------------------------------------------------------------
+
+    def invalidate(self, sender=None, **kwargs):
+        transaction.on_commit(self.bump_generation)
+
+    def bump_generation(self):
+        bump_version(self.cache, f"{self.prefix}:generation")
+        self.compiled.clear()
+
+
+navigation = CompiledNavigation()
+
+# The structures are the ones from examples/settings-example.py, moved here
+# unchanged; settings then references the callbacks:
+#
+#   "SIDEBAR": {"navigation": "myapp.admin.sidebar_navigation"},
+#   "TABS": "myapp.admin.tabs_navigation",
+#   "ACCOUNT": {"navigation": "myapp.admin.account_navigation"},
+#   "SITE_DROPDOWN": "myapp.admin.site_dropdown_navigation",
+
+
+def is_superuser(request):
+    return request.user.is_superuser
+
+
+sidebar_navigation = navigation.register("sidebar", [
+    {
+        "items": [
+            {"title": _("Dashboard"), "icon": "dashboard", "link": reverse_lazy("admin:index")},
+        ],
+    },
+    {
+        "title": _("Shop"),
+        "collapsible": True,
+        "items": [
+            {
+                "title": _("Orders"),
+                "icon": "shopping_cart",
+                "link": reverse_lazy("admin:shop_order_changelist"),
+                "badge": "myapp.admin.orders_badge",
+            },
+            {"title": _("Products"), "icon": "inventory_2", "link": reverse_lazy("admin:shop_product_changelist")},
+        ],
+    },
+    {
+        "title": _("Users & Groups"),
+        "collapsible": True,
+        "items": [
+            {
+                "title": _("Users"),
+                "icon": "person",
+                "link": reverse_lazy("admin:auth_user_changelist"),
+                "permission": is_superuser,
+            },
+            {
+                "title": _("Groups"),
+                "icon": "group",
+                "link": reverse_lazy("admin:auth_group_changelist"),
+                "permission": is_superuser,
+            },
+        ],
+    },
+])
+
+tabs_navigation = navigation.register("tabs", [
+    {
+        "models": ["shop.product", "shop.category"],
+        "items": [
+            {"title": _("Products"), "link": reverse_lazy("admin:shop_product_changelist")},
+            {"title": _("Categories"), "link": reverse_lazy("admin:shop_category_changelist")},
+        ],
+    },
+])
+
+account_navigation = navigation.register("account", [
+    {
+        "title": _("Profile"),
+        "icon": "person",
+        "link": reverse_lazy("admin:auth_user_change", args=[USER_PK_PLACEHOLDER]),
+    },
+])
+
+site_dropdown_navigation = navigation.register("site_dropdown", [
+    {"title": _("Main Site"), "icon": "home", "link": "/"},
+    {"title": _("Documentation"), "icon": "description", "link": "/docs/"},
+])
+
+
+# =============================================================================
+# Context providers
+# =============================================================================
+# ENVIRONMENT and GLOBAL_CALLBACK run on every admin page (sometimes twice,
+# when a view builds each_context() more than once). In real projects
+# GLOBAL_CALLBACK grows database lookups ("open tickets", "current tenant").
+#
+# ContextProviders splits that work into named providers, each memoized for
+# its scope:
+#
+#   "process" -> once per worker process, until `ttl` seconds pass (ttl=None:
+#                until restart). Settings, os.environ, static lookups; never
+#                anything that depends on request.user.
+#   "user"    -> in the shared cache per user for `ttl` seconds. Per-user
+#                counts and preferences.
+#   "request" -> once per request. Anything that must be current.
+#
+# Every provider call is timed. ContextProviderTimingMiddleware reports the
+# timings of the current request as a Server-Timing header (browser devtools,
+# Network -> Timing) for staff users, and logs them at DEBUG level.
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Provider:
+    name: str
+    func: object  # callable(request)
+    scope: str
+    ttl: int | None
+    values: dict = field(default_factory=dict)  # process scope: {"value": ..., "expires": ...}
+
+
+class ContextProviders:
+    """Memoized ENVIRONMENT / GLOBAL_CALLBACK providers with per-request timings."""
+
+    scopes = ("process", "user", "request")
+    request_attr = "_unfold_context_providers"
+
+    def __init__(self, cache_alias="default", prefix="unfold:context"):
+        self.cache_alias = cache_alias
+        self.prefix = prefix
+        self.providers = {}
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def provider(self, scope="process", ttl=60, name=None):
+        """Decorator registering func(request) as a provider."""
+        if scope not in self.scopes:
+            raise ImproperlyConfigured(f"Provider scope must be one of {self.scopes}, not {scope!r}.")
+
+        def decorator(func):
+            self.providers[name or func.__name__] = Provider(name or func.__name__, func, scope, ttl)
+            return func
+
+        return decorator
+
+    def callback(self, name):
+        """A settings callback returning one provider's value (e.g. ENVIRONMENT)."""
+
+        def callback(request):
+            return self.value(request, name)
+
+        callback.__name__ = f"{name}_callback"
+        return callback
+
+    def merged(self, *names):
+        """A settings callback merging dict providers into one context (GLOBAL_CALLBACK)."""
+
+        def callback(request):
+            context = {}
+            for name in names:
+                context.update(self.value(request, name) or {})
+            return context
+
+        callback.__name__ = "global_callback"
+        return callback
+
+    # -------------------------------------------------------------------------
+    # Reading
+    # -------------------------------------------------------------------------
+
+    def state(self, request):
+        state = getattr(request, self.request_attr, None)
+        if state is None:
+            state = {"values": {}, "timings": []}
+            setattr(request, self.request_attr, state)
+        return state
+
+    def value(self, request, name):
+        provider = self.providers[name]
+        state = self.state(request)
+        if name in state["values"]:
+            return state["values"][name]
+
+        start = time.perf_counter()
+        value, source = self.lookup(request, provider)
+        state["timings"].append((name, provider.scope, source, (time.perf_counter() - start) * 1000))
+        state["values"][name] = value
+        return value
+
+    def lookup(self, request, provider):
+        """Return (value, "hit" | "miss") for the provider's scope."""
+        if provider.scope == "process":
+            entry = provider.values
+            if entry and (entry["expires"] is None or entry["expires"] > time.monotonic()):
+                return entry["value"], "hit"
+            value = provider.func(request)
+            expires = None if provider.ttl is None else time.monotonic() + provider.ttl
+            provider.values = {"value": value, "expires": expires}
+            return value, "miss"
+
+        if provider.scope == "user":
+            key = f"{self.prefix}:{provider.name}:{request.user.pk}"
+            entry = self.cache.get(key)
+            if entry is not None:
+                return entry[0], "hit"  # wrapped, so None/{} values are cached too
+            value = provider.func(request)
+            self.cache.set(key, (value,), provider.ttl)
+            return value, "miss"
+
+        return provider.func(request), "miss"
+
+    def timings(self, request):
+        return self.state(request)["timings"]
+
+    # -------------------------------------------------------------------------
+    # Invalidation
+    # -------------------------------------------------------------------------
+
+    def invalidate(self, name, user=None):
+        """Drop a memoized value: this process's, or one user's from the cache."""
+        provider = self.providers[name]
+        if provider.scope == "user" and user is not None:
+            self.cache.delete(f"{self.prefix}:{name}:{user.pk}")
+        provider.values = {}
+
+
+class ContextProviderTimingMiddleware:
+    """Report provider timings as Server-Timing (staff only) and DEBUG logs."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        # TemplateResponses are rendered by now, so each_context() has run
+        timings = getattr(request, ContextProviders.request_attr, {}).get("timings")
+        if not timings:
+            return response
+
+        logger.debug(
+            "context providers for %s: %s",
+            request.path,
+            ", ".join(f"{name} {ms:.1f}ms ({scope} {source})" for name, scope, source, ms in timings),
+        )
+        if getattr(request, "user", None) is not None and request.user.is_staff:
+            entries = [
+                f'ctx-{name};dur={ms:.2f};desc="{scope} {source}"' for name, scope, source, ms in timings
+            ]
+            if response.has_header("Server-Timing"):
+                entries.insert(0, response["Server-Timing"])
+            response["Server-Timing"] = ", ".join(entries)
+        return response
+
+
+providers = ContextProviders()
+
+
+@providers.provider(scope="process", ttl=None)
+def environment(request):
+    env = os.environ.get("DJANGO_ENV", "development")
+    if env == "production":
+        return None
+    return ["Staging", "warning"] if env == "staging" else ["Development", "info"]
+
+
+@providers.provider(scope="process", ttl=None)
+def support(request):
+    return {"support_url": "https://support.example.com"}
+
+
+@providers.provider(scope="user", ttl=60)
+def my_changes(request):
+    from django.contrib.admin.models import LogEntry
+
+    since = timezone.now() - timedelta(days=1)
+    return {"my_changes_today": LogEntry.objects.filter(user_id=request.user.pk, action_time__gte=since).count()}
+
+
+# settings.py:
+#   "ENVIRONMENT": "myapp.admin.environment_callback",
+#   "GLOBAL_CALLBACK": "myapp.admin.global_callback",
+# and add "myapp.admin.ContextProviderTimingMiddleware" to MIDDLEWARE
+# (after AuthenticationMiddleware).
+environment_callback = providers.callback("environment")
+global_callback = providers.merged("support", "my_changes")
+
+
+# =============================================================================
+# Asset bundle
+# =============================================================================
+# Every STYLES / SCRIPTS entry is called on every page (`lambda request:
+# static(...)`) and becomes its own <link>/<script> request. AssetBundle reads
+# the request-independent entries once, concatenates and minifies them, and
+# serves one file per type under a content hash:
+#
+#   STYLES  -> /admin-assets/admin.3f2a9c1d0b7e.css
+#   SCRIPTS -> /admin-assets/admin.8c41e0a2d9f3.js
+#
+# - The hash is in the URL, so the response is `Cache-Control: immutable` for
+#   a year; a deploy that changes any source changes the URL.
+# - Relative url(...) references in CSS are rewritten to static URLs, since
+#   the bundle is served from a different path than the source files.
+# - rcssmin / rjsmin are used when installed; otherwise CSS comments are
+#   stripped and JS is concatenated unchanged (gzip does most of the work).
+# - AssetPreloadMiddleware sends `Link: <...>; rel=preload` for the bundle
+#   (and Unfold's own stylesheet) with every admin HTML page, so the browser
+#   starts fetching before it parses <head>; servers that support 103 Early
+#   Hints can forward the header even earlier.
+#
+# Entries that really depend on the request (per-user theme CSS) stay as
+# callables in settings, next to the bundle callback.
+
+CSS_URL = re.compile(r"""url\((['"]?)(?!data:|https?:|//|/|#)([^'")?#]+)([^'")]*)\1\)""")
+
+
+def minify(kind, text):
+    try:
+        if kind == "css":
+            from rcssmin import cssmin
+
+            return cssmin(text)
+        from rjsmin import jsmin
+
+        return jsmin(text)
+    except ImportError:  # rcssmin / rjsmin are optional
+        return re.sub(r"/\*.*?\*/", "", text, flags=re.S) if kind == "css" else text
+
+
+class AssetBundle:
+    """STYLES / SCRIPTS static files served as one fingerprinted file per type."""
+
+    url_name = "admin_asset_bundle"
+    content_types = {"css": "text/css; charset=utf-8", "js": "text/javascript; charset=utf-8"}
+    preload_as = {"css": "style", "js": "script"}
+
+    def __init__(self, styles=(), scripts=(), preload=("unfold/css/styles.css",)):
+        self.sources = {"css": list(styles), "js": list(scripts)}
+        self.preload = list(preload)
+        self.built = {}
+        self.lock = threading.Lock()
+
+    # -------------------------------------------------------------------------
+    # Building
+    # -------------------------------------------------------------------------
+
+    def static_path(self, entry):
+        # Entries are static paths or the same callables STYLES takes; those
+        # must not need the request (they are called with None)
+        value = str(entry(None) if callable(entry) else entry)
+        if value.startswith(settings.STATIC_URL):
+            value = value[len(settings.STATIC_URL):]
+        return value.split("?")[0]
+
+    def read(self, static_path):
+        # Finders work before collectstatic; the storage serves hashed names after it
+        absolute = finders.find(static_path)
+        if absolute:
+            with open(absolute, encoding="utf-8") as handle:
+                return handle.read()
+        with staticfiles_storage.open(static_path) as handle:
+            return handle.read().decode("utf-8")
+
+    def absolutize(self, static_path, css):
+        base = posixpath.dirname(static_path)
+
+        def replace(match):
+            quote, target, suffix = match.groups()
+            return f"url({quote}{static(posixpath.normpath(posixpath.join(base, target)))}{suffix}{quote})"
+
+        return CSS_URL.sub(replace, css)
+
+    def build(self):
+        """Read, rewrite, minify and hash both bundles (call from AppConfig.ready())."""
+        with self.lock:
+            if self.built:
+                return
+            built = {}
+            for kind, entries in self.sources.items():
+                parts = []
+                for entry in entries:
+                    static_path = self.static_path(entry)
+                    text = self.read(static_path)
+                    if kind == "css":
+                        text = self.absolutize(static_path, text)
+                    parts.append(f"/* {static_path} */\n{minify(kind, text)}")
+                content = (";\n" if kind == "js" else "\n").join(parts).encode("utf-8")
+                built[kind] = (hashlib.sha256(content).hexdigest()[:12], content)
+            self.built = built
+
+    def get(self, kind):
+        if not self.built:
+            self.build()
+        return self.built[kind]
+
+    # -------------------------------------------------------------------------
+    # Serving
+    # -------------------------------------------------------------------------
+
+    def url(self, kind):
+        digest, _content = self.get(kind)
+        return reverse(self.url_name, args=[f"admin.{digest}.{kind}"])
+
+    def styles(self, request):
+        return self.url("css")
+
+    def scripts(self, request):
+        return self.url("js")
+
+    def view(self, request, filename):
+        match = re.fullmatch(r"admin\.([0-9a-f]{12})\.(css|js)", filename)
+        if match is None:
+            raise Http404
+        digest, kind = match.groups()
+        current, content = self.get(kind)
+        if digest != current:
+            raise Http404  # an old hash after a deploy; the page asks for the new one
+        if request.headers.get("If-None-Match") == f'"{digest}"':
+            response = HttpResponse(status=304)
+        else:
+            response = HttpResponse(content, content_type=self.content_types[kind])
+        response["ETag"] = f'"{digest}"'
+        response["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+    def get_urls(self):
+        return [path("admin-assets/<str:filename>", self.view, name=self.url_name)]
+
+    def link_header(self):
+        links = [f"<{self.url(kind)}>; rel=preload; as={self.preload_as[kind]}" for kind in self.sources if self.sources[kind]]
+        links += [f"<{static(asset)}>; rel=preload; as=style" for asset in self.preload]
+        return ", ".join(links)
+
+
+admin_assets = AssetBundle(
+    styles=["css/admin-custom.css"],
+    scripts=[lambda request: static("js/admin-custom.js")],  # request-independent, so bundled
+)
+
+
+admin_styles = admin_assets.styles
+admin_scripts = admin_assets.scripts
+
+
+class AssetPreloadMiddleware:
+    """Send Link: rel=preload for the admin bundle with admin HTML pages."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        match = getattr(request, "resolver_match", None)
+        if (
+            match is not None
+            and admin.site.name in match.namespaces
+            and response.get("Content-Type", "").startswith("text/html")
+        ):
+            response["Link"] = ", ".join(filter(None, [response.get("Link"), admin_assets.link_header()]))
+        return response
+
+
+# settings.py:
+#   "STYLES": ["myapp.admin.admin_styles"],   # plus any per-request entries
+#   "SCRIPTS": ["myapp.admin.admin_scripts"],
+# and add "myapp.admin.AssetPreloadMiddleware" to MIDDLEWARE.
+#
+# urls.py, next to the admin:
+#   urlpatterns = [*admin_assets.get_urls(), path("admin/", admin.site.urls)]
@@ -148,6 +148,8 @@ UNFOLD = {
         "show_all_applications": False, # "All applications" dropdown
 
         # IMPORTANT: Each entry in navigation must have an "items" list
+        # Resolved on every render; to compile it once per permission set, see
+        # CompiledNavigation in examples/performance-settings.py
         "navigation": [
             # Group 1: Dashboard (no section header)
             {
@@ -364,7 +366,8 @@ UNFOLD = {
 # Callback Functions (typically in myapp/admin.py)
 # =============================================================================
 
-# Dashboard callback
+# Dashboard callback — runs on every dashboard hit. On large tables, read
+# precomputed counts instead (MetricRegistry in examples/performance-settings.py).
 def dashboard_callback(request, context):
     """Add custom data to dashboard context."""
     from django.contrib.auth import get_user_model
@@ -396,7 +399,8 @@ def environment_callback(request):
         return ["Development", "info"]
 
 
-# Badge callbacks
+# Badge callbacks — these run a COUNT on every admin page render. For busy
+# tables, see the cached BadgeRegistry in examples/performance-settings.py.
 def posts_badge(request):
     """Return draft post count for badge."""
     from blog.models import Post